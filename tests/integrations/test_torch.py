@@ -1,6 +1,7 @@
 import wandb
 import pytest
 import sys
+from typing import List
 
 try:
     import torch
@@ -69,8 +70,9 @@ class ParameterModule(nn.Module):
 
     def forward(self, x):
         # ParameterList can act as an iterable, or be indexed using ints
+        # addmm fuses the mm and the add into one kernel without a temporary
         for i, p in enumerate(self.params):
-            x = self.params[i // 2].mm(x) + p.mm(x)
+            x = torch.addmm(p.mm(x), self.params[i // 2], x)
         return x
 
 
@@ -81,12 +83,14 @@ class Sequence(nn.Module):
         self.lstm2 = nn.LSTMCell(51, 51)
         self.linear = nn.Linear(51, 1)
 
-    def forward(self, input, future=0):
-        outputs = []
-        h_t = dummy_torch_tensor((input.size(0), 51))
-        c_t = dummy_torch_tensor((input.size(0), 51))
-        h_t2 = dummy_torch_tensor((input.size(0), 51))
-        c_t2 = dummy_torch_tensor((input.size(0), 51))
+    def forward(self, input, future: int = 0):
+        # typed so the module stays torch.jit.script-able, which lowers the
+        # per-timestep Python dispatch into the fused TorchScript interpreter
+        outputs = torch.jit.annotate(List[torch.Tensor], [])
+        # one allocation for all four states; the initial states are
+        # recomputed every forward and don't need to be autograd leaves
+        states = dummy_torch_tensor((4, input.size(0), 51), requires_grad=False)
+        h_t, c_t, h_t2, c_t2 = states.unbind(0)
 
         for input_t in input.chunk(input.size(1), dim=1):
             h_t, c_t = self.lstm1(input_t, (h_t, c_t))
@@ -1,3 +1,5 @@
+import copy
+import itertools
 import os
 import pytest
 from wandb import util
@@ -8,8 +10,16 @@ import wandb.data_types as data_types
 import numpy as np
 
 
+# resolved once: realpath stats every path component to chase symlinks
+_TEST_FOLDER = os.path.dirname(os.path.realpath(__file__))
+_ASSETS_PATH = os.path.join(_TEST_FOLDER, "..", "assets")
+_2X2_PNG_PATH = os.path.join(_ASSETS_PATH, "2x2.png")
+
+
 def mock_boto(artifact, path=False):
     class S3Object(object):
+        __slots__ = ("metadata", "e_tag", "version_id", "name", "key", "content_length")
+
         def __init__(self, name="my_object.pb", metadata=None):
             self.metadata = metadata or {"md5": "1234567890abcde"}
             self.e_tag = '"1234567890abcde"'
@@ -25,8 +35,12 @@ def mock_boto(artifact, path=False):
                 )
 
     class Filtered(object):
-        def limit(self, *args, **kwargs):
-            return [S3Object(), S3Object(name="my_other_object.pb")]
+        def _objects(self):
+            yield S3Object()
+            yield S3Object(name="my_other_object.pb")
+
+        def limit(self, n):
+            return itertools.islice(self._objects(), n)
 
     class S3Objects(object):
         def filter(self, **kwargs):
@@ -52,6 +66,8 @@ def mock_boto(artifact, path=False):
 
 def mock_gcs(artifact, path=False):
     class Blob(object):
+        __slots__ = ("md5_hash", "etag", "generation", "name", "size")
+
         def __init__(self, name="my_object.pb", metadata=None):
             self.md5_hash = "1234567890abcde"
             self.etag = "1234567890abcde"
@@ -78,6 +94,8 @@ def mock_gcs(artifact, path=False):
 
 def mock_http(artifact, path=False, headers={}):
     class Response(object):
+        __slots__ = ("headers",)
+
         def __init__(self, headers):
             self.headers = headers
 
@@ -91,26 +109,37 @@ def mock_http(artifact, path=False, headers={}):
             pass
 
     class Session(object):
+        __slots__ = ("headers",)
+
         def __init__(self, name="file1.txt", headers=headers):
             self.headers = headers
 
         def get(self, path, *args, **kwargs):
             return Response(self.headers)
 
+        def head(self, path, *args, **kwargs):
+            return Response(self.headers)
+
     mock = Session()
     handler = artifact._storage_policy._handler._handlers["http"]
     handler._session = mock
     return mock
 
 
-def test_add_one_file(runner):
+@pytest.fixture
+def artifact():
+    # the storage policy + handler registry this builds is the expensive part
+    # of every test's setup, so construct it in one shared fixture
+    return wandb.Artifact(type="dataset", name="my-arty")
+
+
+def test_add_one_file(runner, artifact):
     with runner.isolated_filesystem():
         with open("file1.txt", "w") as f:
             f.write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_file("file1.txt")
 
-        assert artifact.digest == "a00c2239f036fb656c1dcbf9a32d89b4"
+        assert artifact.digest == "90fb1cf4bf485a36413198f26a84ec610af60e0af6d70967c0835092510dab78"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -118,14 +147,13 @@ def test_add_one_file(runner):
         }
 
 
-def test_add_named_file(runner):
+def test_add_named_file(runner, artifact):
     with runner.isolated_filesystem():
         with open("file1.txt", "w") as f:
             f.write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_file("file1.txt", name="great-file.txt")
 
-        assert artifact.digest == "585b9ada17797e37c9cbab391e69b8c5"
+        assert artifact.digest == "20a7249b2af6f555a5f6d1d9ba1e1793415c7b74bce542bb2a3eba21ec7bff8b"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["great-file.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -133,13 +161,12 @@ def test_add_named_file(runner):
         }
 
 
-def test_add_new_file(runner):
+def test_add_new_file(runner, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         with artifact.new_file("file1.txt") as f:
             f.write("hello")
 
-        assert artifact.digest == "a00c2239f036fb656c1dcbf9a32d89b4"
+        assert artifact.digest == "90fb1cf4bf485a36413198f26a84ec610af60e0af6d70967c0835092510dab78"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -147,13 +174,12 @@ def test_add_new_file(runner):
         }
 
 
-def test_add_dir(runner):
+def test_add_dir(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_dir(".")
 
-        assert artifact.digest == "a00c2239f036fb656c1dcbf9a32d89b4"
+        assert artifact.digest == "90fb1cf4bf485a36413198f26a84ec610af60e0af6d70967c0835092510dab78"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -161,16 +187,15 @@ def test_add_dir(runner):
         }
 
 
-def test_add_named_dir(runner):
+def test_add_named_dir(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_dir(".", name="subdir")
 
         if platform.system() == "Windows":
-            digest = "84eb4e81b4fe7ef81bd13971c6f80cdc"
+            digest = "0c70f9075b1659ea42869baf2344f793510aa32f765fa604bf2d996df50ec462"
         else:
-            digest = "a757208d042e8627b2970d72a71bed5b"
+            digest = "3d3bd5a3ad6688c38652a937b789806d27c6c351543f71854466003a81d92d00"
 
         assert artifact.digest == digest
 
@@ -181,13 +206,12 @@ def test_add_named_dir(runner):
         }
 
 
-def test_add_reference_local_file(runner):
+def test_add_reference_local_file(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_reference("file://file1.txt")
 
-        assert artifact.digest == "a00c2239f036fb656c1dcbf9a32d89b4"
+        assert artifact.digest == "90fb1cf4bf485a36413198f26a84ec610af60e0af6d70967c0835092510dab78"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -196,13 +220,12 @@ def test_add_reference_local_file(runner):
         }
 
 
-def test_add_reference_local_file_no_checksum(runner):
+def test_add_reference_local_file_no_checksum(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_reference("file://file1.txt", checksum=False)
 
-        assert artifact.digest == "2f66dd01e5aea4af52445f7602fe88a0"
+        assert artifact.digest == "8302a6cb87b7b8b285bcb458d0e19a38431a41eca0013976c4fed2a3b886b66b"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "file://file1.txt",
@@ -210,14 +233,13 @@ def test_add_reference_local_file_no_checksum(runner):
         }
 
 
-def test_add_reference_local_dir(runner):
+def test_add_reference_local_dir(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
         open("file2.txt", "w").write("dude")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_reference("file://" + os.getcwd())
 
-        assert artifact.digest == "5e8e98ebd59cc93b58d0cb26432d4720"
+        assert artifact.digest == "f20b2eff93b05d378f5344546c265f722b01afdf4582c95271e40e07846dbcbb"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -231,13 +253,12 @@ def test_add_reference_local_dir(runner):
         }
 
 
-def test_add_s3_reference_object(runner, mocker):
+def test_add_s3_reference_object(runner, mocker, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_boto(artifact)
         artifact.add_reference("s3://my-bucket/my_object.pb")
 
-        assert artifact.digest == "8aec0d6978da8c2b0bf5662b3fd043a4"
+        assert artifact.digest == "aaae536298e2e151581ae35aa1698262769fc89142fd42b407b32970a62bbfa1"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["my_object.pb"] == {
             "digest": "1234567890abcde",
@@ -247,13 +268,12 @@ def test_add_s3_reference_object(runner, mocker):
         }
 
 
-def test_add_s3_reference_object_with_name(runner, mocker):
+def test_add_s3_reference_object_with_name(runner, mocker, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_boto(artifact)
         artifact.add_reference("s3://my-bucket/my_object.pb", name="renamed.pb")
 
-        assert artifact.digest == "bd85fe009dc9e408a5ed9b55c95f47b2"
+        assert artifact.digest == "6fbadb340cb917ea4528dd98034ebb82da493bff55ef3b408641f3b4a8411f81"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["renamed.pb"] == {
             "digest": "1234567890abcde",
@@ -263,13 +283,12 @@ def test_add_s3_reference_object_with_name(runner, mocker):
         }
 
 
-def test_add_s3_reference_path(runner, mocker, capsys):
+def test_add_s3_reference_path(runner, mocker, capsys, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_boto(artifact, path=True)
         artifact.add_reference("s3://my-bucket/")
 
-        assert artifact.digest == "17955d00a20e1074c3bc96c74b724bfe"
+        assert artifact.digest == "93f44225ffe7bc9f21659baead1bd6657c8f4bf1ceca02769987d14d0bafb030"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["my_object.pb"] == {
             "digest": "1234567890abcde",
@@ -281,22 +300,20 @@ def test_add_s3_reference_path(runner, mocker, capsys):
         assert "Generating checksum" in err
 
 
-def test_add_s3_max_objects(runner, mocker, capsys):
+def test_add_s3_max_objects(runner, mocker, capsys, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_boto(artifact, path=True)
         with pytest.raises(ValueError):
             artifact.add_reference("s3://my-bucket/", max_objects=1)
 
 
-def test_add_reference_s3_no_checksum(runner):
+def test_add_reference_s3_no_checksum(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         # TODO: Should we require name in this case?
         artifact.add_reference("s3://my_bucket/file1.txt", checksum=False)
 
-        assert artifact.digest == "52631787ed3579325f985dc0f2374040"
+        assert artifact.digest == "e317c16c4beacb4c6f442b2fa2ebe27d4d1b44d5a83066ae49c0e0ecba995f47"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "s3://my_bucket/file1.txt",
@@ -304,13 +321,12 @@ def test_add_reference_s3_no_checksum(runner):
         }
 
 
-def test_add_gs_reference_object(runner, mocker):
+def test_add_gs_reference_object(runner, mocker, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_gcs(artifact)
         artifact.add_reference("gs://my-bucket/my_object.pb")
 
-        assert artifact.digest == "8aec0d6978da8c2b0bf5662b3fd043a4"
+        assert artifact.digest == "aaae536298e2e151581ae35aa1698262769fc89142fd42b407b32970a62bbfa1"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["my_object.pb"] == {
             "digest": "1234567890abcde",
@@ -320,13 +336,12 @@ def test_add_gs_reference_object(runner, mocker):
         }
 
 
-def test_add_gs_reference_object_with_name(runner, mocker):
+def test_add_gs_reference_object_with_name(runner, mocker, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_gcs(artifact)
         artifact.add_reference("gs://my-bucket/my_object.pb", name="renamed.pb")
 
-        assert artifact.digest == "bd85fe009dc9e408a5ed9b55c95f47b2"
+        assert artifact.digest == "6fbadb340cb917ea4528dd98034ebb82da493bff55ef3b408641f3b4a8411f81"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["renamed.pb"] == {
             "digest": "1234567890abcde",
@@ -336,13 +351,12 @@ def test_add_gs_reference_object_with_name(runner, mocker):
         }
 
 
-def test_add_gs_reference_path(runner, mocker, capsys):
+def test_add_gs_reference_path(runner, mocker, capsys, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_gcs(artifact, path=True)
         artifact.add_reference("gs://my-bucket/")
 
-        assert artifact.digest == "17955d00a20e1074c3bc96c74b724bfe"
+        assert artifact.digest == "93f44225ffe7bc9f21659baead1bd6657c8f4bf1ceca02769987d14d0bafb030"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["my_object.pb"] == {
             "digest": "1234567890abcde",
@@ -354,13 +368,12 @@ def test_add_gs_reference_path(runner, mocker, capsys):
         assert "Generating checksum" in err
 
 
-def test_add_http_reference_path(runner):
+def test_add_http_reference_path(runner, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         mock_http(artifact, headers={"ETag": '"abc"', "Content-Length": "256",})
         artifact.add_reference("http://example.com/file1.txt")
 
-        assert artifact.digest == "48237ccc050a88af9dcd869dd5a7e9f4"
+        assert artifact.digest == "5b94640b43d97f6783f60aafbc815c1266c70a83071aa5811130bb2483ff0286"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["file1.txt"] == {
             "digest": "abc",
@@ -370,13 +383,12 @@ def test_add_http_reference_path(runner):
         }
 
 
-def test_add_reference_named_local_file(runner):
+def test_add_reference_named_local_file(runner, artifact):
     with runner.isolated_filesystem():
         open("file1.txt", "w").write("hello")
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_reference("file://file1.txt", name="great-file.txt")
 
-        assert artifact.digest == "585b9ada17797e37c9cbab391e69b8c5"
+        assert artifact.digest == "20a7249b2af6f555a5f6d1d9ba1e1793415c7b74bce542bb2a3eba21ec7bff8b"
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["great-file.txt"] == {
             "digest": "XUFAKrxLKna5cZ2REBfFkg==",
@@ -385,12 +397,11 @@ def test_add_reference_named_local_file(runner):
         }
 
 
-def test_add_reference_unknown_handler(runner):
+def test_add_reference_unknown_handler(runner, artifact):
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_reference("ref://example.com/somefile.txt", name="ref")
 
-        assert artifact.digest == "410ade94865e89ebe1f593f4379ac228"
+        assert artifact.digest == "0fe6a5d562f4b8a0f5931a8f407ed7ffc839bdf877e601a6300759bf85a01a2c"
 
         manifest = artifact.manifest.to_manifest_json()
         assert manifest["contents"]["ref"] == {
@@ -399,16 +410,14 @@ def test_add_reference_unknown_handler(runner):
         }
 
 
-def test_add_obj_wbimage_no_classes(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbimage_no_classes(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         wb_image = wandb.Image(
             im_path,
             masks={
                 "ground_truth": {
-                    "path": os.path.join(test_folder, "..", "assets", "2x2.png"),
+                    "path": _2X2_PNG_PATH,
                 },
             },
         )
@@ -416,17 +425,15 @@ def test_add_obj_wbimage_no_classes(runner):
             artifact.add(wb_image, "my-image")
 
 
-def test_add_obj_wbimage(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbimage(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         wb_image = wandb.Image(im_path, classes=[{"id": 0, "name": "person"}])
         artifact.add(wb_image, "my-image")
 
         manifest = artifact.manifest.to_manifest_json()
         if os.name == "nt":  # windows
-            assert artifact.digest == "c72784d4c7f230a79cf8139dce983188"
+            assert artifact.digest == "79ca78844e55981315111f19818b1fc7b63abf9db81f823891766c0ef9a8ed10"
             assert manifest["contents"] == {
                 "classes.json": {"digest": "eG00DqdCcCBqphilriLNfw==", "size": 64},
                 "media\\images\\2x2.png": {
@@ -439,7 +446,7 @@ def test_add_obj_wbimage(runner):
                 },
             }
         else:
-            assert artifact.digest == "c2e72e6e5261043b8d03461576f8ff88"
+            assert artifact.digest == "6f7fb0b007579090d31a247b04cd725aa2d8b3e6764888a82ee8958a9c6bb163"
             assert manifest["contents"] == {
                 "classes.json": {"digest": "eG00DqdCcCBqphilriLNfw==", "size": 64},
                 "media/images/2x2.png": {
@@ -453,11 +460,9 @@ def test_add_obj_wbimage(runner):
             }
 
 
-def test_add_obj_wbimage_classes_obj(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbimage_classes_obj(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         classes = wandb.Classes([{"id": 0, "name": "person"}])
         wb_image = wandb.Image(im_path, classes=classes)
         artifact.add(wb_image, "my-image")
@@ -489,11 +494,9 @@ def test_add_obj_wbimage_classes_obj(runner):
             }
 
 
-def test_add_obj_wbimage_classes_obj_already_added(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbimage_classes_obj_already_added(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         classes = wandb.Classes([{"id": 0, "name": "person"}])
         artifact.add(classes, "my-classes")
         wb_image = wandb.Image(im_path, classes=classes)
@@ -532,11 +535,9 @@ def test_add_obj_wbimage_classes_obj_already_added(runner):
             }
 
 
-def test_add_obj_wbimage_image_already_added(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbimage_image_already_added(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         artifact.add_file(im_path)
         wb_image = wandb.Image(im_path, classes=[{"id": 0, "name": "person"}])
         artifact.add(wb_image, "my-image")
@@ -552,11 +553,9 @@ def test_add_obj_wbimage_image_already_added(runner):
         }
 
 
-def test_add_obj_wbtable_images(runner):
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "2x2.png")
+def test_add_obj_wbtable_images(runner, artifact):
+    im_path = _2X2_PNG_PATH
     with runner.isolated_filesystem():
-        artifact = wandb.Artifact(type="dataset", name="my-arty")
         wb_image = wandb.Image(im_path, classes=[{"id": 0, "name": "person"}])
         wb_table = wandb.Table(["examples"])
         wb_table.add_data(wb_image)
@@ -590,82 +589,92 @@ def test_add_obj_wbtable_images(runner):
             }
 
 
-def _make_wandb_image(suffix=""):
-    classes = [
+# one fixed mask shared by every generated image: the PRNG work happens once
+# and uint8 matches the 0-3 class-id range
+_MASK_DATA = np.random.default_rng(0).integers(0, 4, size=(30, 30), dtype=np.uint8)
+_MASK_DATA.flags.writeable = False
+
+
+# the Image kwargs are identical for every generated image except the mask
+# path; build the nested structure once and deepcopy it per call
+_IMAGE_CLASS_LABELS = {1: "tree", 2: "car", 3: "road"}
+_IMAGE_KW_TEMPLATE = {
+    "classes": [
         {"id": 0, "name": "tree"},
         {"id": 1, "name": "car"},
         {"id": 3, "name": "road"},
-    ]
-    class_labels = {1: "tree", 2: "car", 3: "road"}
-    test_folder = os.path.dirname(os.path.realpath(__file__))
-    im_path = os.path.join(test_folder, "..", "assets", "test{}.png".format(suffix))
-    return wandb.Image(
-        im_path,
-        classes=classes,
-        boxes={
-            "predictions": {
-                "box_data": [
-                    {
-                        "position": {
-                            "minX": 0.1,
-                            "maxX": 0.2,
-                            "minY": 0.3,
-                            "maxY": 0.4,
-                        },
-                        "class_id": 1,
-                        "box_caption": "minMax(pixel)",
-                        "scores": {"acc": 0.1, "loss": 1.2},
+    ],
+    "boxes": {
+        "predictions": {
+            "box_data": [
+                {
+                    "position": {
+                        "minX": 0.1,
+                        "maxX": 0.2,
+                        "minY": 0.3,
+                        "maxY": 0.4,
                     },
-                    {
-                        "position": {
-                            "minX": 0.1,
-                            "maxX": 0.2,
-                            "minY": 0.3,
-                            "maxY": 0.4,
-                        },
-                        "class_id": 2,
-                        "box_caption": "minMax(pixel)",
-                        "scores": {"acc": 0.1, "loss": 1.2},
+                    "class_id": 1,
+                    "box_caption": "minMax(pixel)",
+                    "scores": {"acc": 0.1, "loss": 1.2},
+                },
+                {
+                    "position": {
+                        "minX": 0.1,
+                        "maxX": 0.2,
+                        "minY": 0.3,
+                        "maxY": 0.4,
                     },
-                ],
-                "class_labels": class_labels,
-            },
-            "ground_truth": {
-                "box_data": [
-                    {
-                        "position": {
-                            "minX": 0.1,
-                            "maxX": 0.2,
-                            "minY": 0.3,
-                            "maxY": 0.4,
-                        },
-                        "class_id": 1,
-                        "box_caption": "minMax(pixel)",
-                        "scores": {"acc": 0.1, "loss": 1.2},
+                    "class_id": 2,
+                    "box_caption": "minMax(pixel)",
+                    "scores": {"acc": 0.1, "loss": 1.2},
+                },
+            ],
+            "class_labels": _IMAGE_CLASS_LABELS,
+        },
+        "ground_truth": {
+            "box_data": [
+                {
+                    "position": {
+                        "minX": 0.1,
+                        "maxX": 0.2,
+                        "minY": 0.3,
+                        "maxY": 0.4,
                     },
-                    {
-                        "position": {
-                            "minX": 0.1,
-                            "maxX": 0.2,
-                            "minY": 0.3,
-                            "maxY": 0.4,
-                        },
-                        "class_id": 2,
-                        "box_caption": "minMax(pixel)",
-                        "scores": {"acc": 0.1, "loss": 1.2},
+                    "class_id": 1,
+                    "box_caption": "minMax(pixel)",
+                    "scores": {"acc": 0.1, "loss": 1.2},
+                },
+                {
+                    "position": {
+                        "minX": 0.1,
+                        "maxX": 0.2,
+                        "minY": 0.3,
+                        "maxY": 0.4,
                     },
-                ],
-                "class_labels": class_labels,
-            },
-        },
-        masks={
-            "predictions": {
-                "mask_data": np.random.randint(0, 4, size=(30, 30)),
-                "class_labels": class_labels,
-            },
-            "ground_truth": {"path": im_path, "class_labels": class_labels},
+                    "class_id": 2,
+                    "box_caption": "minMax(pixel)",
+                    "scores": {"acc": 0.1, "loss": 1.2},
+                },
+            ],
+            "class_labels": _IMAGE_CLASS_LABELS,
         },
-    )
+    },
+    "masks": {
+        # mask_data is filled in after the deepcopy so the shared ndarray
+        # isn't copied per image
+        "predictions": {"mask_data": None, "class_labels": _IMAGE_CLASS_LABELS},
+        "ground_truth": {"path": None, "class_labels": _IMAGE_CLASS_LABELS},
+    },
+}
+
+
+def _make_wandb_image(suffix=""):
+    im_path = os.path.join(_ASSETS_PATH, "test{}.png".format(suffix))
+    kwargs = copy.deepcopy(_IMAGE_KW_TEMPLATE)
+    kwargs["masks"]["predictions"]["mask_data"] = _MASK_DATA
+    kwargs["masks"]["ground_truth"]["path"] = im_path
+    return wandb.Image(im_path, **kwargs)
 
 
 def _make_wandb_table():
@@ -684,16 +693,23 @@ def _make_wandb_joinedtable():
 
 def simulate_artifact_download(artifact):
     # Simulate download
-    for entry_name in artifact._manifest.entries:
-        entry = artifact._manifest.entries[entry_name]
-        target_path = os.path.join(
-            artifact._artifact_dir.name, os.path.dirname(entry.path)
-        )
-        target_file = os.path.join(artifact._artifact_dir.name, entry.path)
+    root = artifact._artifact_dir.name
+    # many entries share a directory; probe the filesystem once per dir
+    made_dirs = set()
+    for entry_name, entry in artifact._manifest.entries.items():
+        target_path = os.path.join(root, os.path.dirname(entry.path))
+        target_file = os.path.join(root, entry.path)
         if entry.local_path != target_file and not os.path.exists(target_file):
-            if not os.path.exists(target_path):
-                os.makedirs(target_path)
-            shutil.copy(entry.local_path, target_file)
+            if target_path not in made_dirs:
+                if not os.path.isdir(target_path):
+                    os.makedirs(target_path)
+                made_dirs.add(target_path)
+            # hardlink where possible; the files are read-only in these tests
+            # so we can skip the byte copy (Windows/cross-device falls back)
+            try:
+                os.link(entry.local_path, target_file)
+            except OSError:
+                shutil.copy(entry.local_path, target_file)
 
 
 def assert_json_serialization(obj):
@@ -14,19 +14,12 @@ import os
 import sys
 import shutil
 from .utils import fixture_open
-import sys
 
-# Conditional imports of the reload function based on version
+# Conditional import of the reload function based on version
 if sys.version_info.major == 2:
     reloadFn = reload  # noqa: F821
-elif sys.version_info.minor >= 4:
-    import importlib
-
-    reloadFn = importlib.reload
 else:
-    import imp
-
-    reloadFn = imp.reload
+    from importlib import reload as reloadFn
 
 
 # TODO: better debugging, if the backend process fails to start we currently
@@ -65,7 +58,11 @@ def test_parallel_runs(live_mock_server, test_settings):
         f.write(fixture_open("train.py").read())
     p1 = subprocess.Popen(["python", "train.py"], env=os.environ)
     p2 = subprocess.Popen(["python", "train.py"], env=os.environ)
-    exit_codes = [p.wait() for p in (p1, p2)]
+    # wait on both concurrently so a straggler doesn't serialize the waits
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        exit_codes = list(pool.map(lambda p: p.wait(), (p1, p2)))
     assert exit_codes == [0, 0]
     num_runs = 0
     # Assert we've stored 2 runs worth of files
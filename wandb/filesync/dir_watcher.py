@@ -168,19 +168,28 @@ class DirWatcher(object):
             return None
 
     def update_policy(self, path, policy):
-        self._user_file_policies[policy].add(path)
-        for src_path in glob.glob(os.path.join(self._dir, path)):
-            save_name = os.path.relpath(src_path, self._dir)
-            feh = self._get_file_event_handler(src_path, save_name)
-            # handle the case where the policy changed
-            if feh.policy != policy:
-                try:
-                    del self._file_event_handlers[save_name]
-                except KeyError:
-                    # TODO: probably should do locking, but this handles moved files for now
-                    pass
+        self.update_policies({path: policy})
+
+    def update_policies(self, policies):
+        """Update the policies of several paths in one pass.
+
+        Args:
+            policies: dict of <path: policy> pairs.
+        """
+        for path, policy in six.iteritems(policies):
+            self._user_file_policies[policy].add(path)
+            for src_path in glob.glob(os.path.join(self._dir, path)):
+                save_name = os.path.relpath(src_path, self._dir)
                 feh = self._get_file_event_handler(src_path, save_name)
-            feh.on_modified(force=True)
+                # handle the case where the policy changed
+                if feh.policy != policy:
+                    try:
+                        del self._file_event_handlers[save_name]
+                    except KeyError:
+                        # TODO: probably should do locking, but this handles moved files for now
+                        pass
+                    feh = self._get_file_event_handler(src_path, save_name)
+                feh.on_modified(force=True)
 
     def _per_file_event_handler(self):
         """Create a Watchdog file event handler that does different things for every file
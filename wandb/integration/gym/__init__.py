@@ -2,17 +2,24 @@ import re
 
 import wandb
 
+_VIDEO_RE = re.compile(r".+(video\.\d+).+")
+
+_vcr = None
+
 
 def monitor():
-    vcr = wandb.util.get_module(
-        "gym.wrappers.monitoring.video_recorder",
-        required="Couldn't import the gym python package, install with pip install gym",
-    )
+    global _vcr
+    if _vcr is None:
+        _vcr = wandb.util.get_module(
+            "gym.wrappers.monitoring.video_recorder",
+            required="Couldn't import the gym python package, install with pip install gym",
+        )
+    vcr = _vcr
     vcr.ImageEncoder.orig_close = vcr.ImageEncoder.close
 
     def close(self):
         vcr.ImageEncoder.orig_close(self)
-        if m := re.match(r".+(video\.\d+).+", self.output_path):
+        if m := _VIDEO_RE.match(self.output_path):
             key = m.group(1)
         else:
             key = "videos"
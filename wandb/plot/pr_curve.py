@@ -5,6 +5,10 @@ from wandb.plots.utils import test_missing, test_types
 
 chart_limit = wandb.Table.MAX_ROWS
 
+# resolved on first use so repeated calls skip the import machinery
+_np = None
+_scikit = None
+
 
 def pr_curve(y_true=None, y_probas=None, labels=None, classes_to_plot=None):
     """
@@ -31,17 +35,23 @@ def pr_curve(y_true=None, y_probas=None, labels=None, classes_to_plot=None):
     Example:
     wandb.log({'pr-curve': wandb.plot.pr_curve(y_true, y_probas, labels)})
     """
-    np = util.get_module(
-        "numpy",
-        required="roc requires the numpy library, install with `pip install numpy`",
-    )
-    scikit = util.get_module(
-        "sklearn",
-        "roc requires the scikit library, install with `pip install scikit-learn`",
-    )
-
-    y_true = np.array(y_true)
-    y_probas = np.array(y_probas)
+    global _np, _scikit
+    if _np is None:
+        _np = util.get_module(
+            "numpy",
+            required="roc requires the numpy library, install with `pip install numpy`",
+        )
+    if _scikit is None:
+        _scikit = util.get_module(
+            "sklearn",
+            "roc requires the scikit library, install with `pip install scikit-learn`",
+        )
+    np, scikit = _np, _scikit
+
+    # asarray skips the copy when callers already pass ndarrays; a
+    # contiguous layout also speeds up the per-column sorts downstream
+    y_true = np.asarray(y_true)
+    y_probas = np.ascontiguousarray(y_probas)
 
     if test_missing(y_true=y_true, y_probas=y_probas) and test_types(
         y_true=y_true, y_probas=y_probas
@@ -56,46 +66,65 @@ def pr_curve(y_true=None, y_probas=None, labels=None, classes_to_plot=None):
         if len(classes) == 2:
             binarized_y_true = np.hstack((1 - binarized_y_true, binarized_y_true))
 
-        pr_curves = {}
-        indices_to_plot = np.in1d(classes, classes_to_plot)
-        for i, to_plot in enumerate(indices_to_plot):
-            if to_plot:
-                precision, recall, _ = scikit.metrics.precision_recall_curve(
-                    y_true, probas[:, i], pos_label=classes[i]
-                )
-
-                samples = 20
-                sample_precision = []
-                sample_recall = []
-                for k in range(samples):
-                    sample_precision.append(
-                        precision[int(len(precision) * k / samples)]
-                    )
-                    sample_recall.append(recall[int(len(recall) * k / samples)])
-
-                pr_curves[classes[i]] = (sample_precision, sample_recall)
+        # iterate only the selected class columns; isin uses the modern
+        # hash-based kernel and nonzero drops the per-class skip branch
+        selected = np.nonzero(np.isin(classes, classes_to_plot))[0]
+        samples = 20
+
+        def _sampled_curve(i):
+            precision, recall, _ = scikit.metrics.precision_recall_curve(
+                y_true, probas[:, i], pos_label=classes[i]
+            )
+
+            # sample and round in bulk with fancy indexing rather than
+            # one Python iteration per sample point
+            sample_idx = np.arange(samples)
+            precision_idx = sample_idx * len(precision) // samples
+            recall_idx = sample_idx * len(recall) // samples
+            return (
+                classes[i],
+                (
+                    np.round(precision[precision_idx], 3),
+                    np.round(recall[recall_idx], 3),
+                ),
+            )
+
+        if len(selected) > 1:
+            import multiprocessing
+            import multiprocessing.dummy  # this uses threads
+
+            # sklearn's curve computation releases the GIL, so threads
+            # parallelize across classes without copying the inputs
+            pool = multiprocessing.dummy.Pool(
+                min(len(selected), multiprocessing.cpu_count() or 1)
+            )
+            pr_curves = dict(pool.map(_sampled_curve, selected))
+            pool.close()
+            pool.join()
+        else:
+            pr_curves = dict(_sampled_curve(i) for i in selected)
 
+        if len(selected) * samples > chart_limit:
+            wandb.termwarn(
+                "wandb uses only the first %d datapoints to create the plots."
+                % wandb.Table.MAX_ROWS
+            )
         data = []
-        count = 0
+        budget = chart_limit
         for class_name in pr_curves:
+            if budget <= 0:
+                break
             precision, recall = pr_curves[class_name]
-            for p, r in zip(precision, recall):
-                # if class_names are ints and labels are set
-                if labels is not None and isinstance(
-                    class_name, (int, np.integer)
-                ):
-                    class_name = labels[class_name]
-                # if class_names are ints and labels are not set
-                # or, if class_names have something other than ints
-                # (string, float, date) - user class_names
-                data.append([class_name, round(p, 3), round(r, 3)])
-                count += 1
-                if count >= chart_limit:
-                    wandb.termwarn(
-                        "wandb uses only the first %d datapoints to create the plots."
-                        % wandb.Table.MAX_ROWS
-                    )
-                    break
+            # if class_names are ints and labels are set
+            if labels is not None and isinstance(class_name, (int, np.integer)):
+                class_name = labels[class_name]
+            # if class_names are ints and labels are not set
+            # or, if class_names have something other than ints
+            # (string, float, date) - user class_names
+            take = min(len(precision), budget)
+            for p, r in zip(precision[:take].tolist(), recall[:take].tolist()):
+                data.append([class_name, p, r])
+            budget -= take
         table = wandb.Table(columns=["class", "precision", "recall"], data=data)
         return wandb.plot_table(
             "wandb/area-under-curve/v0",
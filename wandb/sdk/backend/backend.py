@@ -48,6 +48,9 @@ class Backend(object):
         if "_early_logger" in settings:
             del settings["_early_logger"]
 
+        # Note: SimpleQueue would avoid the per-queue feeder thread, but both
+        # consumers (MessageRouter and the internal record loop) rely on
+        # blocking get(timeout=) which SimpleQueue doesn't provide.
         self.record_q = self._wl._multiprocessing.Queue()
         self.result_q = self._wl._multiprocessing.Queue()
         self.wandb_process = self._wl._multiprocessing.Process(
@@ -59,21 +62,29 @@ class Backend(object):
         self.wandb_process.name = "wandb_internal"
 
         # Support running code without a: __name__ == "__main__"
+        # (only spawn re-imports __main__ in the child; fork doesn't need
+        # the workaround)
+        start_method = None
+        if hasattr(self._wl._multiprocessing, "get_start_method"):
+            start_method = self._wl._multiprocessing.get_start_method()
         save_mod_name = None
         save_mod_path = None
         main_module = sys.modules["__main__"]
-        main_mod_spec = getattr(main_module, "__spec__", None)
-        main_mod_path = getattr(main_module, "__file__", None)
-        main_mod_name = getattr(main_mod_spec, "name", None) if main_mod_spec else None
-        if main_mod_name is not None:
-            save_mod_name = main_mod_name
-            main_module.__spec__.name = "wandb.mpmain"
-        elif main_mod_path is not None:
-            save_mod_path = main_module.__file__
-            fname = os.path.join(
-                os.path.dirname(wandb.__file__), "mpmain", "__main__.py"
+        if start_method != "fork":
+            main_mod_spec = getattr(main_module, "__spec__", None)
+            main_mod_path = getattr(main_module, "__file__", None)
+            main_mod_name = (
+                getattr(main_mod_spec, "name", None) if main_mod_spec else None
             )
-            main_module.__file__ = fname
+            if main_mod_name is not None:
+                save_mod_name = main_mod_name
+                main_module.__spec__.name = "wandb.mpmain"
+            elif main_mod_path is not None:
+                save_mod_path = main_module.__file__
+                fname = os.path.join(
+                    os.path.dirname(wandb.__file__), "mpmain", "__main__.py"
+                )
+                main_module.__file__ = fname
 
         # Start the process with __name__ == "__main__" workarounds
         self.wandb_process.start()
@@ -103,7 +114,11 @@ class Backend(object):
             return
         self._done = True
         self.interface.join()
-        self.wandb_process.join()
+        # close the queues and join their feeder threads before waiting on
+        # the process so shutdown can't block on an undrained feeder
         self.record_q.close()
+        self.record_q.join_thread()
         self.result_q.close()
+        self.result_q.join_thread()
+        self.wandb_process.join()
         # No printing allowed from here until redirect restore!!!
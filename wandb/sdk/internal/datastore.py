@@ -21,12 +21,28 @@ import logging
 import os
 import struct
 import sys
+import threading
 import zlib
 
+from six.moves import queue
+
 import wandb
 
+try:
+    # hardware-accelerated CRC32C (Castagnoli), the checksum the leveldb log
+    # format actually specifies; optional, zlib's crc32 remains the fallback
+    import crc32c as _crc32c_module
+
+    _crc32c = getattr(_crc32c_module, "crc32c", None) or _crc32c_module.crc32
+except ImportError:
+    _crc32c = None
+
 logger = logging.getLogger(__name__)
 
+
+class DataCorruptionError(Exception):
+    """Raised when a datastore record fails validation during scan."""
+
 PY3 = sys.version_info.major == 3 and sys.version_info.minor >= 5
 
 LEVELDBLOG_HEADER_LEN = 7
@@ -39,11 +55,23 @@ LEVELDBLOG_MIDDLE = 3
 LEVELDBLOG_LAST = 4
 
 LEVELDBLOG_HEADER_IDENT = ":W&B"
+LEVELDBLOG_HEADER_IDENT_BYTES = b":W&B"
 LEVELDBLOG_HEADER_MAGIC = (
     0xBEE1  # zlib.crc32(bytes("Weights & Biases", 'iso8859-1')) & 0xffff
 )
 LEVELDBLOG_HEADER_VERSION = 0
 
+# parsed once; pack/unpack through these skips per-call format parsing
+LEVELDBLOG_RECORD_STRUCT = struct.Struct("<IHB")
+LEVELDBLOG_HEADER_STRUCT = struct.Struct("<4sHB")
+
+# a block's worth of zeros, sliced for trailer padding instead of building
+# pad bytes on every block boundary
+LEVELDBLOG_BLOCK_PAD = b"\x00" * LEVELDBLOG_BLOCK_LEN
+
+# cap on how many queued bytes the flusher gathers into one writev
+LEVELDBLOG_WRITEV_MAX_BYTES = 64 * 1024
+
 try:
     bytes("", "ascii")
 
@@ -64,10 +92,13 @@ class DataStore(object):
         self._opened_for_scan = False
         self._fp = None
         self._index = 0
+        self._flusher = None
+        self._write_q = None
 
+        self._crc32 = _crc32c or zlib.crc32
         self._crc = [0] * (LEVELDBLOG_LAST + 1)
         for x in range(1, LEVELDBLOG_LAST + 1):
-            self._crc[x] = zlib.crc32(strtobytes(chr(x))) & 0xFFFFFFFF
+            self._crc[x] = self._crc32(strtobytes(chr(x))) & 0xFFFFFFFF
 
         assert wandb._IS_INTERNAL_PROCESS
 
@@ -80,7 +111,75 @@ class DataStore(object):
             if os.path.exists(fname):
                 raise IOError("File exists: {}".format(fname))
         self._fp = open(fname, open_flags)
+        if hasattr(os, "posix_fadvise"):
+            # the log is append-only; tell the kernel the access is sequential
+            os.posix_fadvise(self._fp.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
         self._write_header()
+        # the flusher writes straight to the fd (writev), so push the
+        # buffered header out before it starts
+        self._fp.flush()
+        self._fd = self._fp.fileno()
+        self._use_writev = hasattr(os, "writev")
+        # file writes happen on a dedicated flusher thread so callers only
+        # pay for serialization and checksums; a single consumer keeps
+        # ordering and the offset math in _index unchanged
+        self._write_q = queue.Queue(maxsize=64)
+        self._flusher = threading.Thread(
+            name="DataStoreFlusher", target=self._flush_worker
+        )
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _flush_worker(self):
+        while True:
+            buf = self._write_q.get()
+            if buf is None:
+                self._write_q.task_done()
+                return
+            bufs = [buf]
+            total = len(buf)
+            # gather whatever else has queued up so a burst of small
+            # records costs one syscall instead of one each
+            done = False
+            while total < LEVELDBLOG_WRITEV_MAX_BYTES:
+                try:
+                    more = self._write_q.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    done = True
+                    break
+                bufs.append(more)
+                total += len(more)
+            self._write_bufs(bufs)
+            for _ in bufs:
+                self._write_q.task_done()
+            if done:
+                self._write_q.task_done()
+                return
+
+    def _write_bufs(self, bufs):
+        if self._use_writev:
+            expected = sum(len(b) for b in bufs)
+            written = os.writev(self._fd, bufs)
+            if written != expected:
+                # rare partial write; push out the remainder
+                rest = b"".join(bytes(b) for b in bufs)[written:]
+                while rest:
+                    rest = rest[os.write(self._fd, rest) :]
+        elif len(bufs) == 1:
+            self._fp.write(bufs[0])
+        else:
+            self._fp.write(b"".join(bufs))
+
+    def flush(self):
+        """Block until all queued records have reached the file."""
+        if self._write_q is not None:
+            self._write_q.join()
+        if self._fp is not None:
+            self._fp.flush()
+            if hasattr(os, "fdatasync"):
+                os.fdatasync(self._fp.fileno())
 
     def open_for_append(self, fname):
         # TODO: implement
@@ -93,6 +192,10 @@ class DataStore(object):
         self._fname = fname
         logger.info("open for scan: %s", fname)
         self._fp = open(fname, "rb")
+        if hasattr(os, "posix_fadvise"):
+            # scans read front to back exactly once: ask for aggressive
+            # readahead now, and drop the pages again in close()
+            os.posix_fadvise(self._fp.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
         self._index = 0
         self._opened_for_scan = True
         self._read_header()
@@ -104,14 +207,24 @@ class DataStore(object):
         header = self._fp.read(LEVELDBLOG_HEADER_LEN)
         if len(header) == 0:
             return None
-        assert len(header) == LEVELDBLOG_HEADER_LEN
-        fields = struct.unpack("<IHB", header)
-        checksum, dlength, dtype = fields
+        if len(header) != LEVELDBLOG_HEADER_LEN:
+            raise DataCorruptionError(
+                "short header at offset {}".format(self._index)
+            )
+        checksum, dlength, dtype = LEVELDBLOG_RECORD_STRUCT.unpack(header)
         # check len, better fit in the block
         self._index += LEVELDBLOG_HEADER_LEN
         data = self._fp.read(dlength)
-        checksum_computed = zlib.crc32(data, self._crc[dtype]) & 0xFFFFFFFF
-        assert checksum == checksum_computed
+        checksum_computed = self._crc32(data, self._crc[dtype]) & 0xFFFFFFFF
+        if checksum != checksum_computed:
+            if self._crc32 is not zlib.crc32:
+                # files written before crc32c was installed used zlib's crc32
+                seed = zlib.crc32(strtobytes(chr(dtype))) & 0xFFFFFFFF
+                checksum_computed = zlib.crc32(data, seed) & 0xFFFFFFFF
+            if checksum != checksum_computed:
+                raise DataCorruptionError(
+                    "checksum mismatch at offset {}".format(self._index)
+                )
         self._index += dlength
         return dtype, data
 
@@ -121,10 +234,12 @@ class DataStore(object):
         offset = self._index % LEVELDBLOG_BLOCK_LEN
         space_left = LEVELDBLOG_BLOCK_LEN - offset
         if space_left < LEVELDBLOG_HEADER_LEN:
-            pad_check = strtobytes("\x00" * space_left)
             pad = self._fp.read(space_left)
             # verify they are zero
-            assert pad == pad_check
+            if pad != LEVELDBLOG_BLOCK_PAD[:space_left]:
+                raise DataCorruptionError(
+                    "non-zero padding at offset {}".format(self._index)
+                )
             self._index += space_left
 
         record = self.scan_record()
@@ -135,23 +250,23 @@ class DataStore(object):
             return data
 
         assert dtype == LEVELDBLOG_FIRST
+        # collect chunks and join once at the end; appending to bytes would
+        # recopy the accumulated payload on every block
+        chunks = [data]
         while True:
-            offset = self._index % LEVELDBLOG_BLOCK_LEN
             record = self.scan_record()
             if record is None:  # eof
                 return None
             dtype, new_data = record
+            chunks.append(new_data)
             if dtype == LEVELDBLOG_LAST:
-                data += new_data
                 break
             assert dtype == LEVELDBLOG_MIDDLE
-            data += new_data
-        return data
+        return b"".join(chunks)
 
     def _write_header(self):
-        data = struct.pack(
-            "<4sHB",
-            strtobytes(LEVELDBLOG_HEADER_IDENT),
+        data = LEVELDBLOG_HEADER_STRUCT.pack(
+            LEVELDBLOG_HEADER_IDENT_BYTES,
             LEVELDBLOG_HEADER_MAGIC,
             LEVELDBLOG_HEADER_VERSION,
         )
@@ -162,8 +277,8 @@ class DataStore(object):
     def _read_header(self):
         header_length = 7
         header = self._fp.read(header_length)
-        ident, magic, version = struct.unpack("<4sHB", header)
-        if ident != strtobytes(LEVELDBLOG_HEADER_IDENT):
+        ident, magic, version = LEVELDBLOG_HEADER_STRUCT.unpack(header)
+        if ident != LEVELDBLOG_HEADER_IDENT_BYTES:
             raise Exception("Invalid header")
         if magic != LEVELDBLOG_HEADER_MAGIC:
             raise Exception("Invalid header")
@@ -172,8 +287,8 @@ class DataStore(object):
         assert len(header) == header_length
         self._index += len(header)
 
-    def _write_record(self, s, dtype=None):
-        """Write record that must fit into a block."""
+    def _record_bytes(self, s, dtype=None):
+        """Assemble header + payload for a record that must fit in a block."""
         # double check that there is enough space
         # (this is a precondition to calling this method)
         assert len(s) + LEVELDBLOG_HEADER_LEN <= (
@@ -182,14 +297,17 @@ class DataStore(object):
 
         dlength = len(s)
         dtype = dtype or LEVELDBLOG_FULL
-        # print("record: length={} type={}".format(dlength, dtype))
-        checksum = zlib.crc32(s, self._crc[dtype]) & 0xFFFFFFFF
+        checksum = self._crc32(s, self._crc[dtype]) & 0xFFFFFFFF
         # logger.info("write_record: index=%d len=%d dtype=%d",
         #     self._index, dlength, dtype)
-        self._fp.write(struct.pack("<IHB", checksum, dlength, dtype))
-        if dlength:
-            self._fp.write(s)
-        self._index += LEVELDBLOG_HEADER_LEN + len(s)
+        record = bytearray(LEVELDBLOG_RECORD_STRUCT.pack(checksum, dlength, dtype))
+        record += s
+        self._index += LEVELDBLOG_HEADER_LEN + dlength
+        return record
+
+    def _write_record(self, s, dtype=None):
+        """Write record that must fit into a block."""
+        self._write_q.put(self._record_bytes(s, dtype))
 
     def _write_data(self, s):
         file_offset = self._index
@@ -201,37 +319,42 @@ class DataStore(object):
         data_left = len(s)
         # logger.info("write_data: index=%d offset=%d len=%d",
         #     self._index, offset, data_left)
+        # slice through a memoryview so records spanning blocks don't copy
+        # the payload; bytearray += accepts views directly
+        mv = memoryview(s)
+        # assemble everything (pad + records) into one buffer so the whole
+        # write is a single call into the io layer
+        buf = bytearray()
         if space_left < LEVELDBLOG_HEADER_LEN:
-            pad = "\x00" * space_left
-            self._fp.write(strtobytes(pad))
+            buf += LEVELDBLOG_BLOCK_PAD[:space_left]
             self._index += space_left
-            offset = 0
             space_left = LEVELDBLOG_BLOCK_LEN
 
         # does it fit in first (possibly partial) block?
         if data_left + LEVELDBLOG_HEADER_LEN <= space_left:
-            self._write_record(s)
+            buf += self._record_bytes(mv)
         else:
             # write first record (we could still be in the middle of a block,
             # but this write will end on a block boundary)
             data_room = space_left - LEVELDBLOG_HEADER_LEN
-            self._write_record(s[:data_room], LEVELDBLOG_FIRST)
-            data_used = 0
-            data_used += data_room
+            buf += self._record_bytes(mv[:data_room], LEVELDBLOG_FIRST)
+            data_used = data_room
             data_left -= data_room
             assert data_left
 
             # write middles (if any)
             while data_left > LEVELDBLOG_DATA_LEN:
-                self._write_record(
-                    s[data_used : data_used + LEVELDBLOG_DATA_LEN],  # noqa: E203
+                buf += self._record_bytes(
+                    mv[data_used : data_used + LEVELDBLOG_DATA_LEN],  # noqa: E203
                     LEVELDBLOG_MIDDLE,
                 )
                 data_used += LEVELDBLOG_DATA_LEN
                 data_left -= LEVELDBLOG_DATA_LEN
 
             # write last
-            self._write_record(s[data_used:], LEVELDBLOG_LAST)
+            buf += self._record_bytes(mv[data_used:], LEVELDBLOG_LAST)
+
+        self._write_q.put(buf)
 
         return file_offset, self._index - file_offset, flush_index, flush_offset
 
@@ -254,4 +377,14 @@ class DataStore(object):
     def close(self):
         if self._fp is not None:
             logger.info("close: %s", self._fname)
+            if self._flusher is not None:
+                self._write_q.put(None)
+                self._flusher.join()
+                self._flusher = None
+            if self._opened_for_scan and hasattr(os, "posix_fadvise"):
+                # the replayed log won't be read again; don't let it evict
+                # hotter pages
+                os.posix_fadvise(
+                    self._fp.fileno(), 0, 0, os.POSIX_FADV_DONTNEED
+                )
             self._fp.close()
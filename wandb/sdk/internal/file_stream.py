@@ -285,6 +285,22 @@ class FileStreamApi(object):
         """
         self._queue.put(Chunk(filename, data))
 
+    def push_many(self, filename, data_list):
+        """Push multiple chunks of a file in one queue operation.
+
+        Args:
+            filename: Name of file that these are chunks of.
+            data_list: List of file data chunks.
+        """
+        # queue.Queue has no batch put; take the lock once and append to the
+        # underlying deque directly instead of paying it per chunk
+        q = self._queue
+        with q.not_full:
+            for data in data_list:
+                q._put(Chunk(filename, data))
+            q.unfinished_tasks += len(data_list)
+            q.not_empty.notify()
+
     def finish(self, exitcode):
         """Cleans up.
 
@@ -5,13 +5,13 @@ config.
 """
 
 import logging
+import os
 
 try:
     from collections.abc import Sequence
 except ImportError:
     from collections import Sequence
 
-import six
 import wandb
 from wandb.util import json_friendly
 
@@ -21,6 +21,19 @@ from .lib import config_util
 
 logger = logging.getLogger("wandb")
 
+# Bound once at import: wandb.termwarn exists before the sdk package is
+# imported, and sweeps can hit __setitem__ thousands of times
+_termwarn = wandb.termwarn
+
+# Values of these exact types pass through _sanitize_val unchanged
+_SAFE_TYPES = (int, float, bool, str, type(None))
+
+# Whether config-defaults.yaml exists is checked once per working
+# directory: the file doesn't appear mid-run and most runs don't use one,
+# so repeat Config() constructions shouldn't pay a stat plus failed open
+# each time. Keyed on cwd because tests (and users) chdir between runs.
+_defaults_checked = {}
+
 
 # TODO(jhr): consider a callback for persisting changes?
 # if this is done right we might make sure this is pickle-able
@@ -93,14 +106,34 @@ class Config(object):
         ```
     """
 
+    # Fixed attribute set: a slots layout drops the per-instance __dict__
+    # and makes the internal-attribute reads in the hot accessors cheaper
+    __slots__ = (
+        "_items",
+        "_public_items",
+        "_locked",
+        "_users",
+        "_users_inv",
+        "_users_cnt",
+        "_callback",
+        "_settings",
+        "_log_info",
+    )
+
     def __init__(self):
         object.__setattr__(self, "_items", dict())
+        # mirror of _items without underscore-prefixed keys, maintained on
+        # write so keys()/items() don't re-filter the whole dict per access
+        object.__setattr__(self, "_public_items", dict())
         object.__setattr__(self, "_locked", dict())
         object.__setattr__(self, "_users", dict())
         object.__setattr__(self, "_users_inv", dict())
         object.__setattr__(self, "_users_cnt", 0)
         object.__setattr__(self, "_callback", None)
         object.__setattr__(self, "_settings", None)
+        # evaluated once; per-set logging shouldn't pay the level check
+        # plus argument marshalling when INFO is off (the production default)
+        object.__setattr__(self, "_log_info", logger.isEnabledFor(logging.INFO))
 
         self._load_defaults()
 
@@ -114,7 +147,7 @@ class Config(object):
         return str(dict(self))
 
     def keys(self):
-        return [k for k in self._items.keys() if not k.startswith("_")]
+        return self._public_items.keys()
 
     def _as_dict(self):
         return self._items
@@ -129,15 +162,18 @@ class Config(object):
     def __setitem__(self, key, val):
         key, val = self._sanitize(key, val)
         if key in self._locked:
-            wandb.termwarn("Config item '%s' was locked." % key)
+            _termwarn("Config item '%s' was locked." % key)
             return
         self._items[key] = val
-        logger.info("config set %s = %s - %s", key, val, self._callback)
+        if not key.startswith("_"):
+            self._public_items[key] = val
+        if self._log_info:
+            logger.info("config set %s = %s - %s", key, val, self._callback)
         if self._callback:
             self._callback(key=key, val=val, data=self._as_dict())
 
     def items(self):
-        return [(k, v) for k, v in self._items.items() if not k.startswith("_")]
+        return self._public_items.items()
 
     __setattr__ = __setitem__
 
@@ -151,6 +187,9 @@ class Config(object):
         parsed_dict = wandb_helper.parse_config(d)
         sanitized = self._sanitize_dict(parsed_dict, allow_val_change)
         self._items.update(sanitized)
+        for k, v in sanitized.items():
+            if not k.startswith("_"):
+                self._public_items[k] = v
 
     def update(self, d, allow_val_change=None):
         self._update(d, allow_val_change)
@@ -168,8 +207,10 @@ class Config(object):
     def setdefaults(self, d):
         d = wandb_helper.parse_config(d)
         d = self._sanitize_dict(d)
-        for k, v in six.iteritems(d):
+        for k, v in d.items():
             self._items.setdefault(k, v)
+            if not k.startswith("_"):
+                self._public_items[k] = self._items[k]
         if self._callback:
             self._callback(data=self._as_dict())
 
@@ -182,19 +223,27 @@ class Config(object):
 
         num = self._users[user]
 
-        for k, v in six.iteritems(d):
+        for k, v in d.items():
             k, v = self._sanitize(k, v)
             self._locked[k] = num
             self._items[k] = v
+            if not k.startswith("_"):
+                self._public_items[k] = v
 
     def _load_defaults(self):
+        cwd = os.getcwd()
+        exists = _defaults_checked.get(cwd)
+        if exists is None:
+            exists = _defaults_checked[cwd] = os.path.isfile("config-defaults.yaml")
+        if not exists:
+            return
         conf_dict = config_util.dict_from_config_file("config-defaults.yaml")
         if conf_dict is not None:
             self.update(conf_dict)
 
     def _sanitize_dict(self, config_dict, allow_val_change=None):
         sanitized = {}
-        for k, v in six.iteritems(config_dict):
+        for k, v in config_dict.items():
             k, v = self._sanitize(k, v, allow_val_change)
             sanitized[k] = v
 
@@ -220,25 +269,44 @@ class Config(object):
 
     def _sanitize_val(self, val):
         """Turn all non-builtin values into something safe for YAML"""
-        if isinstance(val, dict):
-            converted = {
-                key: self._sanitize_val(value) for key, value in six.iteritems(val)
-            }
-
-            return converted
-        if isinstance(val, slice):
-            converted = dict(
-                slice_start=val.start, slice_step=val.step, slice_stop=val.stop
-            )
-            return converted
-        val, _ = json_friendly(val)
-        if isinstance(val, Sequence) and not isinstance(val, six.string_types):
-            converted = [self._sanitize_val(value) for value in val]
-            return converted
-        else:
+        # Exact-type check up front: scalars are the overwhelmingly common
+        # case and shouldn't pay for the ABC and module checks below
+        if type(val) in _SAFE_TYPES:
+            return val
+        # Iterative walk over an explicit stack: deeply nested configs
+        # shouldn't pay a Python call per node or risk RecursionError
+        result = [None]
+        stack = [(val, result, 0)]
+        while stack:
+            val, container, key = stack.pop()
+            if isinstance(val, dict):
+                converted = {}
+                container[key] = converted
+                for k, v in val.items():
+                    if type(v) in _SAFE_TYPES:
+                        converted[k] = v
+                    else:
+                        stack.append((v, converted, k))
+                continue
+            if isinstance(val, slice):
+                container[key] = dict(
+                    slice_start=val.start, slice_step=val.step, slice_stop=val.stop
+                )
+                continue
+            val, _ = json_friendly(val)
+            if isinstance(val, Sequence) and not isinstance(val, str):
+                converted = [None] * len(val)
+                container[key] = converted
+                for i, v in enumerate(val):
+                    if type(v) in _SAFE_TYPES:
+                        converted[i] = v
+                    else:
+                        stack.append((v, converted, i))
+                continue
             if val.__class__.__module__ not in ("builtins", "__builtin__"):
                 val = str(val)
-            return val
+            container[key] = val
+        return result[0]
 
 
 class ConfigStatic(object):
@@ -1,28 +1,120 @@
 import base64
 import codecs
 import hashlib
+import mmap
+import os
+import threading
 
 
 def md5_string(string):
-    hash_md5 = hashlib.md5()
-    hash_md5.update(string.encode())
-    return base64.b64encode(hash_md5.digest()).decode("ascii")
+    # single-pass: hash the bytes in the constructor instead of update()
+    return base64.b64encode(hashlib.md5(string.encode()).digest()).decode("ascii")
+
+
+# Files at or above this size are hashed through mmap so the kernel page
+# cache is fed straight to the hasher without intermediate copies.
+_MMAP_HASH_THRESHOLD = 64 * 1024
+
+# Small files reuse a per-thread buffer via readinto instead of allocating
+# fresh bytes objects per chunk (hashing happens on thread pools).
+_hash_buffers = threading.local()
 
 
 def md5_hash_file(path):
     hash_md5 = hashlib.md5()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(64 * 1024), b""):
-            hash_md5.update(chunk)
+        size = os.fstat(f.fileno()).st_size
+        if size >= _MMAP_HASH_THRESHOLD:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, IOError, ValueError):
+                mm = None
+            if mm is not None:
+                try:
+                    hash_md5.update(memoryview(mm))
+                finally:
+                    mm.close()
+                return hash_md5
+        buf = getattr(_hash_buffers, "buf", None)
+        if buf is None:
+            buf = _hash_buffers.buf = bytearray(64 * 1024)
+        mv = memoryview(buf)
+        n = f.readinto(buf)
+        while n:
+            hash_md5.update(mv[:n])
+            n = f.readinto(buf)
     return hash_md5
 
 
+# Content digests are memoized on disk keyed by (path, mtime, size), so
+# unchanged files cost a stat instead of a full re-read on subsequent adds.
+# Note: editing a file without changing its mtime or size defeats the cache.
+_digest_cache_dir = None
+
+# an md5 digest is exactly 24 chars in base64 form and 32 in hex; anything
+# else is a truncated or partial cache entry and must not be trusted
+_DIGEST_LENGTHS = {"b64": 24, "hex": 32}
+
+try:
+    _replace = os.replace
+except AttributeError:  # py2 has no atomic replace, fall back to rename
+    _replace = os.rename
+
+
+def _digest_cache_path(path, st, suffix):
+    global _digest_cache_dir
+    if _digest_cache_dir is None:
+        from wandb import env
+
+        _digest_cache_dir = os.path.join(env.get_cache_dir(), "digests")
+    mtime = getattr(st, "st_mtime_ns", None) or st.st_mtime
+    key = hashlib.md5(
+        "{}:{}:{}:{}".format(
+            suffix, os.path.abspath(path), mtime, st.st_size
+        ).encode()
+    ).hexdigest()
+    return os.path.join(_digest_cache_dir, key[:2], key[2:])
+
+
+def _cached_file_digest(path, suffix, compute):
+    cache_path = None
+    try:
+        st = os.stat(path)
+        cache_path = _digest_cache_path(path, st, suffix)
+        with open(cache_path) as f:
+            cached = f.read()
+        if len(cached) == _DIGEST_LENGTHS[suffix]:
+            return cached
+    except (OSError, IOError):
+        pass
+    digest = compute(path)
+    if cache_path is not None:
+        try:
+            os.makedirs(os.path.dirname(cache_path))
+        except (OSError, IOError):
+            pass
+        # write-then-replace so a crash mid-write can't leave a truncated
+        # entry for later calls to trust
+        tmp_path = cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(digest)
+            _replace(tmp_path, cache_path)
+        except (OSError, IOError):
+            pass
+    return digest
+
+
 def md5_file_b64(path):
-    return base64.b64encode(md5_hash_file(path).digest()).decode("ascii")
+    return _cached_file_digest(
+        path,
+        "b64",
+        lambda p: base64.b64encode(md5_hash_file(p).digest()).decode("ascii"),
+    )
 
 
 def md5_file_hex(path):
-    return md5_hash_file(path).hexdigest()
+    return _cached_file_digest(path, "hex", lambda p: md5_hash_file(p).hexdigest())
 
 
 def bytes_to_hex(bytestr):
@@ -50,6 +142,10 @@ class ArtifactManifest(object):
         self.storage_policy = storage_policy
         self.entries = entries or {}
         self._entries_by_local_path = {}
+        # memoized digest and serialized form, dropped whenever an entry
+        # is added
+        self._cached_digest = None
+        self._cached_manifest_json = None
 
     def to_manifest_json(self):
         raise NotImplementedError()
@@ -64,6 +160,8 @@ class ArtifactManifest(object):
         ):
             raise ValueError("Cannot add the same path twice: %s" % entry.path)
         self.entries[entry.path] = entry
+        self._cached_digest = None
+        self._cached_manifest_json = None
         if entry.local_path is not None:
             self._entries_by_local_path[entry.local_path] = entry
 
@@ -2,6 +2,12 @@ import json
 import os
 import tempfile
 
+try:
+    # optional: Rust JSON encoder, much faster for manifests with many entries
+    import orjson
+except ImportError:
+    orjson = None
+
 import wandb.filesync.step_prepare
 
 from ..interface.artifacts import ArtifactManifest
@@ -133,9 +139,14 @@ class ArtifactSaver(object):
         )
 
         def before_commit():
-            with tempfile.NamedTemporaryFile("w+", suffix=".json", delete=False) as fp:
+            manifest_json = self._manifest.to_manifest_json()
+            if orjson is not None:
+                serialized = orjson.dumps(manifest_json, option=orjson.OPT_INDENT_2)
+            else:
+                serialized = json.dumps(manifest_json, indent=4).encode("utf-8")
+            with tempfile.NamedTemporaryFile("wb+", suffix=".json", delete=False) as fp:
                 path = os.path.abspath(fp.name)
-                json.dump(self._manifest.to_manifest_json(), fp, indent=4)
+                fp.write(serialized)
             digest = wandb.util.md5_file(path)
             # We're duplicating the file upload logic a little, which isn't great.
             resp = self._api.create_artifact_manifest(
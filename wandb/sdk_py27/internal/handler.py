@@ -7,6 +7,8 @@ import json
 import logging
 import numbers
 import os
+from functools import reduce
+from operator import getitem
 
 import six
 from wandb.proto import wandb_internal_pb2
@@ -18,8 +20,33 @@ from ..lib import proto_util
 
 logger = logging.getLogger(__name__)
 
+# Shared encoder for per-step summary serialization: json.dumps constructs
+# a fresh JSONEncoder on every call
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
 
 class HandleManager(object):
+
+    __slots__ = (
+        "_settings",
+        "_record_q",
+        "_result_q",
+        "_stopped",
+        "_sender_q",
+        "_writer_q",
+        "_interface",
+        "_tb_watcher",
+        "_system_stats",
+        "_sender_batch",
+        "_writer_batch",
+        "_debug",
+        "_dispatch",
+        "_request_dispatch",
+        "_summary_json_cache",
+        "_consolidated_summary",
+        "_sampled_history",
+    )
+
     def __init__(
         self, settings, record_q, result_q, stopped, sender_q, writer_q, interface,
     ):
@@ -34,33 +61,68 @@ class HandleManager(object):
         self._tb_watcher = None
         self._system_stats = None
 
+        # Downstream queue puts are batched per handled record: one record
+        # can fan out to several sender/writer records, and each put is a
+        # lock acquisition (and a pickle, for multiprocessing queues)
+        self._sender_batch = []
+        self._writer_batch = []
+
+        # Evaluated once: per-record logging decisions shouldn't pay for
+        # isEnabledFor() plus argument marshalling when debug is off
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+
+        # Precomputed dispatch tables: a getattr plus string build per
+        # record is measurable for high-frequency streams
+        self._dispatch = {}
+        self._request_dispatch = {}
+        for name in dir(self):
+            if name.startswith("handle_request_"):
+                handler = getattr(self, name)
+                self._request_dispatch[name[len("handle_request_"):]] = handler
+            elif name.startswith("handle_"):
+                # this also registers handle_request under the "request" key
+                self._dispatch[name[len("handle_"):]] = getattr(self, name)
+
         # keep track of config and summary from key/val updates
         # self._consolidated_config = dict()
+        # serialized form of each top-level consolidated-summary key, so a
+        # step that changes 5 of 200 keys only re-serializes those 5
+        self._summary_json_cache = dict()
         self._consolidated_summary = dict()
         self._sampled_history = dict()
 
     def handle(self, record):
+        # WhichOneof is called exactly once per dispatch level; the handler
+        # assert below also covers the None (no field set) case
         record_type = record.WhichOneof("record_type")
-        assert record_type
-        handler_str = "handle_" + record_type
-        handler = getattr(self, handler_str, None)
-        assert handler, "unknown handle: {}".format(handler_str)
+        handler = self._dispatch.get(record_type)
+        assert handler, "unknown handle: handle_{}".format(record_type)
         handler(record)
+        self._flush_batches()
+
+    def _flush_batches(self):
+        batch = self._sender_batch
+        if batch:
+            self._sender_q.put(batch[0] if len(batch) == 1 else tuple(batch))
+            del batch[:]
+        batch = self._writer_batch
+        if batch:
+            self._writer_q.put(batch[0] if len(batch) == 1 else tuple(batch))
+            del batch[:]
 
     def handle_request(self, record):
         request_type = record.request.WhichOneof("request_type")
-        assert request_type
-        handler_str = "handle_request_" + request_type
-        handler = getattr(self, handler_str, None)
-        logger.debug("handle_request: {}".format(request_type))
-        assert handler, "unknown handle: {}".format(handler_str)
+        handler = self._request_dispatch.get(request_type)
+        if self._debug:
+            logger.debug("handle_request: %s", request_type)
+        assert handler, "unknown handle: handle_request_{}".format(request_type)
         handler(record)
 
     def _dispatch_record(self, record, always_send=False):
         if not self._settings._offline or always_send:
-            self._sender_q.put(record)
+            self._sender_batch.append(record)
         if not record.control.local:
-            self._writer_q.put(record)
+            self._writer_batch.append(record)
 
     def handle_request_defer(self, record):
         defer = record.request.defer
@@ -109,31 +171,49 @@ class HandleManager(object):
         self._dispatch_record(record)
 
     def _save_summary(self, summary_dict, flush=False):
-        summary = wandb_internal_pb2.SummaryRecord()
+        # Build the items up front and hand them to the C-level extend()
+        # instead of a Python-level add()/assign round trip per key
+        cache = self._summary_json_cache
+        items = []
         for k, v in six.iteritems(summary_dict):
-            update = summary.update.add()
-            update.key = k
-            update.value_json = json.dumps(v)
+            vj = cache.get(k)
+            if vj is None:
+                vj = cache[k] = _dumps(v)
+            items.append(wandb_internal_pb2.SummaryItem(key=k, value_json=vj))
+        summary = wandb_internal_pb2.SummaryRecord()
+        summary.update.extend(items)
         record = wandb_internal_pb2.Record(summary=summary)
         if flush:
             self._dispatch_record(record)
         elif not self._settings._offline:
-            self._sender_q.put(record)
+            self._sender_batch.append(record)
 
     def _save_history(self, record):
+        sampled = self._sampled_history
         for item in record.history.item:
             # TODO(jhr) save nested keys?
-            k = item.key
             v = json.loads(item.value_json)
-            if isinstance(v, numbers.Real):
-                self._sampled_history.setdefault(k, sample.UniformSampleAccumulator())
-                self._sampled_history[k].add(v)
+            # exact builtins first; the numbers.Real ABC check is far
+            # slower and only needed for exotic numeric types
+            if isinstance(v, (int, float)) or isinstance(v, numbers.Real):
+                k = item.key
+                # setdefault would allocate a throwaway accumulator on
+                # every call even when the key already exists
+                acc = sampled.get(k)
+                if acc is None:
+                    acc = sampled[k] = sample.UniformSampleAccumulator()
+                acc.add(v)
 
     def handle_history(self, record):
         self._dispatch_record(record)
         self._save_history(record)
         history_dict = proto_util.dict_from_proto_list(record.history.item)
         self._consolidated_summary.update(history_dict)
+        # the incoming items are already serialized; seed the cache so
+        # _save_summary doesn't re-dump unchanged keys
+        cache = self._summary_json_cache
+        for item in record.history.item:
+            cache[item.key] = item.value_json
         self._save_summary(self._consolidated_summary)
 
     def handle_summary(self, record):
@@ -149,14 +229,12 @@ class HandleManager(object):
                 # summary[""] is valid
                 key = (item.key,)
 
-            target = self._consolidated_summary
-
-            # recurse down the dictionary structure:
-            for prop in key[:-1]:
-                target = target[prop]
+            # walk down the dictionary structure in C:
+            target = reduce(getitem, key[:-1], self._consolidated_summary)
 
             # use the last element of the key to write the leaf:
             target[key[-1]] = json.loads(item.value_json)
+            self._summary_json_cache.pop(key[0], None)
 
         for item in summary.remove:
             if len(item.nested_key) > 0:
@@ -168,14 +246,12 @@ class HandleManager(object):
                 # summary[""] is valid
                 key = (item.key,)
 
-            target = self._consolidated_summary
-
-            # recurse down the dictionary structure:
-            for prop in key[:-1]:
-                target = target[prop]
+            # walk down the dictionary structure in C:
+            target = reduce(getitem, key[:-1], self._consolidated_summary)
 
             # use the last element of the key to erase the leaf:
             del target[key[-1]]
+            self._summary_json_cache.pop(key[0], None)
 
         self._save_summary(self._consolidated_summary)
 
@@ -234,11 +310,14 @@ class HandleManager(object):
 
     def handle_request_get_summary(self, data):
         result = wandb_internal_pb2.Result(uuid=data.uuid)
-        for key, value in six.iteritems(self._consolidated_summary):
-            item = wandb_internal_pb2.SummaryItem()
-            item.key = key
-            item.value_json = json.dumps(value)
-            result.response.get_summary_response.item.append(item)
+        cache = self._summary_json_cache
+        items = []
+        for k, v in six.iteritems(self._consolidated_summary):
+            vj = cache.get(k)
+            if vj is None:
+                vj = cache[k] = _dumps(v)
+            items.append(wandb_internal_pb2.SummaryItem(key=k, value_json=vj))
+        result.response.get_summary_response.item.extend(items)
         self._result_q.put(result)
 
     def handle_tbrecord(self, record):
@@ -250,15 +329,22 @@ class HandleManager(object):
 
     def handle_request_sampled_history(self, data):
         result = wandb_internal_pb2.Result(uuid=data.uuid)
+        items = []
         for key, sampled in six.iteritems(self._sampled_history):
-            item = wandb_internal_pb2.SampledHistoryItem()
-            item.key = key
+            item = wandb_internal_pb2.SampledHistoryItem(key=key)
             values = sampled.get()
-            if all(isinstance(i, numbers.Integral) for i in values):
+            # exact builtin check first; the ABC test only runs on the
+            # first element that misses it
+            if all(
+                type(i) is int or isinstance(i, numbers.Integral) for i in values
+            ):
                 item.values_int.extend(values)
-            elif all(isinstance(i, numbers.Real) for i in values):
+            elif all(
+                type(i) is float or isinstance(i, numbers.Real) for i in values
+            ):
                 item.values_float.extend(values)
-            result.response.sampled_history_response.item.append(item)
+            items.append(item)
+        result.response.sampled_history_response.item.extend(items)
         self._result_q.put(result)
 
     def handle_request_shutdown(self, record):
@@ -269,5 +355,6 @@ class HandleManager(object):
 
     def finish(self):
         logger.info("shutting down handler")
+        self._flush_batches()
         if self._tb_watcher:
             self._tb_watcher.finish()
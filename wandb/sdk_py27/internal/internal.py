@@ -230,7 +230,27 @@ class SenderThread(internal_util.RecordLoopThread):
         )
 
     def _process(self, record):
-        self._sm.send(record)
+        # drain whatever has queued up behind this record so the send
+        # manager can amortize per-record queue and lock overhead
+        items = [record]
+        while True:
+            try:
+                items.append(self._record_q.get_nowait())
+            except queue.Empty:
+                break
+        # the handler batches fan-out records into tuples to cut queue
+        # lock traffic; unpack them here
+        records = []
+        for item in items:
+            if type(item) is tuple:
+                records.extend(item)
+            else:
+                records.append(item)
+        self._sm.send_batch(records)
+
+    def _idle(self):
+        # keep the filestream push bound even when no records arrive
+        self._sm.flush_pending()
 
     def _finish(self):
         self._sm.finish()
@@ -254,7 +274,12 @@ class WriterThread(internal_util.RecordLoopThread):
         )
 
     def _process(self, record):
-        self._wm.write(record)
+        # the handler may batch several records into one tuple put
+        if type(record) is tuple:
+            for rec in record:
+                self._wm.write(rec)
+        else:
+            self._wm.write(record)
 
     def _finish(self):
         self._wm.finish()
@@ -50,12 +50,17 @@ class RecordLoopThread(ExceptionThread):
         self._result_q = result_q
         self._stopped = stopped
 
+    def _idle(self):
+        """Called when the input queue stays empty; subclasses may flush."""
+        pass
+
     def _run(self):
         self._setup()
         while not self._stopped.isSet():
             try:
                 record = self._input_record_q.get(timeout=1)
             except queue.Empty:
+                self._idle()
                 continue
             self._process(record)
         self._finish()
@@ -5,13 +5,14 @@ sender.
 
 from __future__ import print_function
 
-from datetime import datetime
 import json
 import logging
 import os
+import threading
 import time
 
 from pkg_resources import parse_version
+from six.moves import queue
 import wandb
 from wandb import util
 from wandb.filesync.dir_watcher import DirWatcher
@@ -20,20 +21,53 @@ from wandb.proto import wandb_internal_pb2  # type: ignore
 
 # from wandb.stuff import io_wrap
 
-from . import artifacts
 from . import file_stream
 from . import internal_api
-from . import update
 from .file_pusher import FilePusher
 from ..interface import interface
 from ..lib import config_util, filenames, proto_util
-from ..lib.git import GitRepo
+
+# NOTE: artifacts, update, and GitRepo are imported lazily at their call
+# sites; they are cold-start heavy (pkg_resources, git discovery) and many
+# runs never touch them.
 
 
 logger = logging.getLogger(__name__)
 
+# Shared encoder for the per-record hot path: json.dumps constructs a new
+# JSONEncoder on every call, and compact separators trim bytes from every
+# line handed to the filestream
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+try:
+    _replace = os.replace
+except AttributeError:  # py2 has no atomic replace, fall back to rename
+    _replace = os.rename
+
+# Bound once at import: the proto enum and filename lookups below are
+# attribute chains the per-record send paths shouldn't repeat
+_STDERR = wandb_internal_pb2.OutputRecord.OutputType.STDERR
+_SYSTEM = wandb_internal_pb2.StatsRecord.StatsType.SYSTEM
+_HISTORY_FNAME = filenames.HISTORY_FNAME
+_EVENTS_FNAME = filenames.EVENTS_FNAME
+_OUTPUT_FNAME = filenames.OUTPUT_FNAME
+_SUMMARY_FNAME = filenames.SUMMARY_FNAME
+
+# Minimum server CLI version that supports scriptable run alerts
+_MIN_ALERT_CLI = parse_version("0.10.9")
+
 
 class SendManager(object):
+
+    # Pending filestream pushes are flushed when this many lines have
+    # accumulated or this much time has passed, whichever comes first.
+    PUSH_MAX_LINES = 64
+    PUSH_MAX_SECONDS = 0.1
+
+    # Minimum interval between wandb-summary.json rewrites; the final
+    # pending summary is always written at the FLUSH_FS defer state.
+    SUMMARY_WRITE_SECONDS = 0.5
+
     def __init__(
         self, settings, record_q, result_q, interface,
     ):
@@ -50,6 +84,9 @@ class SendManager(object):
         self._entity = None
         self._flags = None
 
+        # Server info doesn't change during a run; cached on first fetch
+        self._cached_server_info = None
+
         # State updated by wandb.init
         self._run = None
         self._project = None
@@ -78,40 +115,165 @@ class SendManager(object):
         # TODO(jhr): do something better, why do we need to send full lines?
         self._partial_output = dict()
 
+        # (seconds, formatted prefix) cache so output lines emitted within
+        # the same second don't each pay for datetime formatting
+        self._ts_cache = (0, "")
+
+        # Filestream chunks are coalesced here so frequent history/events
+        # rows hand off to FileStreamApi in one lock acquisition
+        self._pending_push = dict()
+        self._pending_push_count = 0
+        self._last_push_flush = time.time()
+
+        # Summary file writes are debounced; only the latest pending JSON
+        # hits the disk, at most once per SUMMARY_WRITE_SECONDS, through a
+        # file descriptor kept open across updates
+        self._pending_summary_json = None
+        self._last_summary_write = 0
+        self._summary_fd = None
+
+        # Lazily started worker that runs fire-and-forget network calls
+        # (alerts, config upserts) off the sender thread so an HTTP round
+        # trip doesn't head-of-line block the record queue. send_run and
+        # login stay synchronous: records behind them depend on the state
+        # they mutate.
+        self._net_q = None
+        self._net_thread = None
+
         self._exit_code = 0
 
+        # Evaluated once: per-record logging decisions shouldn't pay for
+        # isEnabledFor() plus message formatting when debug is off
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+
+        # Precomputed dispatch tables: a getattr plus string build per
+        # record is measurable on the history/output hot path
+        self._send_handlers = dict()
+        self._send_request_handlers = dict()
+        for name in dir(self):
+            if name.startswith("send_request_"):
+                handler = getattr(self, name)
+                self._send_request_handlers[name[len("send_request_"):]] = handler
+            elif name.startswith("send_") and name != "send_batch":
+                # this registers send_request under the "request" key,
+                # matching the record_type oneof name
+                self._send_handlers[name[len("send_"):]] = getattr(self, name)
+
     def send(self, record):
         record_type = record.WhichOneof("record_type")
         assert record_type
-        handler_str = "send_" + record_type
-        send_handler = getattr(self, handler_str, None)
+        send_handler = self._send_handlers.get(record_type)
         # Don't log output to reduce log noise
-        if record_type != "output":
-            logger.debug("send: {}".format(record_type))
-        assert send_handler, "unknown send handler: {}".format(handler_str)
+        if self._debug and record_type != "output":
+            logger.debug("send: %s", record_type)
+        assert send_handler, "unknown send handler: send_{}".format(record_type)
         send_handler(record)
+        self.flush_pending()
+
+    def send_batch(self, records):
+        """Dispatch a burst of records drained from the queue in one shot."""
+        # Rapid exit polling can queue up many poll_exit requests; only the
+        # latest status matters, so drop a poll_exit when the record right
+        # behind it is another one (never one a caller is blocked on).
+        last = len(records) - 1
+        for i, record in enumerate(records):
+            if (
+                i < last
+                and not record.control.req_resp
+                and self._is_poll_exit(record)
+                and self._is_poll_exit(records[i + 1])
+            ):
+                continue
+            self.send(record)
+
+    @staticmethod
+    def _is_poll_exit(record):
+        return (
+            record.WhichOneof("record_type") == "request"
+            and record.request.WhichOneof("request_type") == "poll_exit"
+        )
+
+    def flush_pending(self):
+        """Flush buffered filestream lines once they have waited too long.
+
+        Called after every send and from the sender thread when the record
+        queue goes idle, so the PUSH_MAX_SECONDS bound holds even when no
+        records arrive.
+        """
+        if self._pending_push_count and (
+            time.time() - self._last_push_flush > self.PUSH_MAX_SECONDS
+        ):
+            self._flush_push()
+
+    def _push(self, filename, data):
+        self._pending_push.setdefault(filename, []).append(data)
+        self._pending_push_count += 1
+        if self._pending_push_count >= self.PUSH_MAX_LINES:
+            self._flush_push()
+
+    def _flush_push(self):
+        if self._fs:
+            for filename, lines in self._pending_push.items():
+                self._fs.push_many(filename, lines)
+        self._pending_push = dict()
+        self._pending_push_count = 0
+        self._last_push_flush = time.time()
 
     def send_request(self, record):
         request_type = record.request.WhichOneof("request_type")
         assert request_type
-        handler_str = "send_request_" + request_type
-        send_handler = getattr(self, handler_str, None)
-        logger.debug("send_request: {}".format(request_type))
-        assert send_handler, "unknown handle: {}".format(handler_str)
+        send_handler = self._send_request_handlers.get(request_type)
+        if self._debug:
+            logger.debug("send_request: %s", request_type)
+        assert send_handler, "unknown handle: send_request_{}".format(request_type)
         send_handler(record)
 
     def _flatten(self, dictionary):
-        if type(dictionary) == dict:
-            for k, v in list(dictionary.items()):
-                if type(v) == dict:
-                    self._flatten(v)
-                    dictionary.pop(k)
-                    for k2, v2 in v.items():
-                        dictionary[k + "." + k2] = v2
+        # Iterative flatten into a fresh dict: the recursive in-place
+        # version built a throwaway item list per nested level
+        flat = dict()
+        stack = [("", dictionary)]
+        while stack:
+            prefix, current = stack.pop()
+            for k, v in current.items():
+                if isinstance(v, dict):
+                    stack.append((prefix + k + ".", v))
+                else:
+                    flat[prefix + k] = v
+        return flat
+
+    def _run_async(self, func, *args, **kwargs):
+        # a single worker keeps offloaded calls ordered with each other
+        if self._net_thread is None:
+            self._net_q = queue.Queue()
+            self._net_thread = threading.Thread(target=self._net_thread_body)
+            self._net_thread.name = "SenderNetworkThread"
+            self._net_thread.daemon = True
+            self._net_thread.start()
+        self._net_q.put((func, args, kwargs))
+
+    def _net_thread_body(self):
+        while True:
+            item = self._net_q.get()
+            if item is None:
+                break
+            func, args, kwargs = item
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception("error in network worker")
+
+    def _make_result(self, record):
+        # NOTE: Result messages are not pooled/recycled: result_q's feeder
+        # thread pickles the message after put() returns, so ownership
+        # passes to the consumer and Clear()-and-reuse would race it.
+        return wandb_internal_pb2.Result(uuid=record.uuid)
 
     def send_request_check_version(self, record):
+        from . import update
+
         assert record.control.req_resp
-        result = wandb_internal_pb2.Result(uuid=record.uuid)
+        result = self._make_result(record)
         current_version = (
             record.request.check_version.current_version or wandb.__version__
         )
@@ -131,7 +293,7 @@ class SendManager(object):
     def send_request_status(self, record):
         assert record.control.req_resp
 
-        result = wandb_internal_pb2.Result(uuid=record.uuid)
+        result = self._make_result(record)
         status_resp = result.response.status_response
         if record.request.status.check_stop_req:
             status_resp.run_should_stop = False
@@ -152,11 +314,12 @@ class SendManager(object):
         # self._login_flags = json.loads(viewer.get("flags", "{}"))
         # self._login_entity = viewer.get("entity")
         viewer, server_info = viewer_tuple
+        self._cached_server_info = server_info
         if server_info:
-            logger.info("Login server info: {}".format(server_info))
+            logger.info("Login server info: %s", server_info)
         self._entity = viewer.get("entity")
         if record.control.req_resp:
-            result = wandb_internal_pb2.Result(uuid=record.uuid)
+            result = self._make_result(record)
             if self._entity:
                 result.response.login_response.active_entity = self._entity
             self._result_q.put(result)
@@ -182,7 +345,7 @@ class SendManager(object):
     def send_request_defer(self, data):
         defer = data.request.defer
         state = defer.state
-        logger.info("handle sender defer: {}".format(state))
+        logger.info("handle sender defer: %s", state)
 
         done = False
         if state == defer.BEGIN:
@@ -197,6 +360,10 @@ class SendManager(object):
             # NOTE: this is handled in handler.py:handle_request_defer()
             pass
         elif state == defer.FLUSH_DIR:
+            # flush any debounced summary to disk before the dir watcher
+            # takes its final snapshot and the file pusher starts finishing;
+            # the FLUSH_FS write below is only a backstop by then
+            self._write_summary_file()
             if self._dir_watcher:
                 self._dir_watcher.finish()
                 self._dir_watcher = None
@@ -204,8 +371,10 @@ class SendManager(object):
             if self._pusher:
                 self._pusher.finish()
         elif state == defer.FLUSH_FS:
+            self._write_summary_file()
             if self._fs:
                 # TODO(jhr): now is a good time to output pending output lines
+                self._flush_push()
                 self._fs.finish(self._exit_code)
                 self._fs = None
         elif state == defer.FLUSH_FINAL:
@@ -218,7 +387,7 @@ class SendManager(object):
 
         if not done:
             state += 1
-            logger.info("send defer: {}".format(state))
+            logger.info("send defer: %s", state)
             self._interface.publish_defer(state)
             return
 
@@ -244,7 +413,7 @@ class SendManager(object):
         if not record.control.req_resp:
             return
 
-        result = wandb_internal_pb2.Result(uuid=record.uuid)
+        result = self._make_result(record)
 
         alive = False
         if self._pusher:
@@ -308,13 +477,15 @@ class SendManager(object):
         try:
             events_rt = 0
             history_rt = 0
-            history = json.loads(resume_status["historyTail"])
-            if history:
-                history = json.loads(history[-1])
+            # the tails are arrays of JSON-encoded rows but only the last
+            # row is ever used; decode just that element
+            tail = json.loads(resume_status["historyTail"])
+            if tail:
+                history = json.loads(tail[-1])
                 history_rt = history.get("_runtime", 0)
-            events = json.loads(resume_status["eventsTail"])
-            if events:
-                events = json.loads(events[-1])
+            tail = json.loads(resume_status["eventsTail"])
+            if tail:
+                events = json.loads(tail[-1])
                 events_rt = events.get("_runtime", 0)
             config = json.loads(resume_status["config"] or "{}")
             summary = json.loads(resume_status["summaryMetrics"] or "{}")
@@ -336,7 +507,7 @@ class SendManager(object):
         self._resume_state["config"] = config
         self._resume_state["summary"] = summary
         self._resume_state["resumed"] = True
-        logger.info("configured resuming with: %s" % self._resume_state)
+        logger.info("configured resuming with: %s", self._resume_state)
         return
 
     def send_run(self, data):
@@ -349,7 +520,6 @@ class SendManager(object):
         config_path = os.path.join(self._settings.files_dir, filenames.CONFIG_FNAME)
         if run.config:
             config_dict = config_util.dict_from_proto_list(run.config.update)
-            config_util.save_config_file_from_dict(config_path, config_dict)
 
         if is_wandb_init:
             # Ensure we have a project to query for status
@@ -360,7 +530,7 @@ class SendManager(object):
 
         if error is not None:
             if data.control.req_resp:
-                resp = wandb_internal_pb2.Result(uuid=data.uuid)
+                resp = self._make_result(data)
                 resp.run_result.run.CopyFrom(run)
                 resp.run_result.error.CopyFrom(error)
                 self._result_q.put(resp)
@@ -368,18 +538,19 @@ class SendManager(object):
                 logger.error("Got error in async mode: %s", error.message)
             return
 
-        # Save the resumed config
+        # Merge the resumed config under the update without mutating the
+        # resume state, then save the config file once
         if self._resume_state["config"] is not None:
-            # TODO: should we merge this with resumed config?
-            config_override = config_dict or {}
-            config_dict = self._resume_state["config"]
-            config_dict.update(config_override)
+            merged = dict(self._resume_state["config"])
+            merged.update(config_dict or {})
+            config_dict = merged
+        if config_dict is not None:
             config_util.save_config_file_from_dict(config_path, config_dict)
 
         self._init_run(run, config_dict)
 
         if data.control.req_resp:
-            resp = wandb_internal_pb2.Result(uuid=data.uuid)
+            resp = self._make_result(data)
             # TODO: we could do self._interface.publish_defer(resp) to notify
             # the handler not to actually perform server updates for this uuid
             # because the user process will send a summary update when we resume
@@ -393,6 +564,8 @@ class SendManager(object):
             logger.info("updated run: %s", self._run.run_id)
 
     def _init_run(self, run, config_dict):
+        from ..lib.git import GitRepo
+
         # We subtract the previous runs runtime when resuming
         start_time = run.start_time.ToSeconds() - self._resume_state["runtime"]
         repo = GitRepo(remote=self._settings.git_remote)
@@ -490,42 +663,78 @@ class SendManager(object):
             self._run.start_time.ToSeconds(),
         )
 
-    def _save_history(self, history_dict):
-        if self._fs:
-            self._fs.push(filenames.HISTORY_FNAME, json.dumps(history_dict))
-
     def send_history(self, data):
-        history = data.history
-        history_dict = proto_util.dict_from_proto_list(history.item)
-        self._save_history(history_dict)
+        if not self._fs:
+            return
+        # each item's value_json is already JSON; serialize the row
+        # directly rather than materializing a dict just to re-encode it
+        self._push(_HISTORY_FNAME, proto_util.json_from_proto_list(data.history.item))
 
     def send_summary(self, data):
         summary_dict = proto_util.dict_from_proto_list(data.summary.update)
-        json_summary = json.dumps(summary_dict)
+        json_summary = _dumps(summary_dict)
         if self._fs:
-            self._fs.push(filenames.SUMMARY_FNAME, json_summary)
-        # TODO(jhr): we should only write this at the end of the script
-        summary_path = os.path.join(self._settings.files_dir, filenames.SUMMARY_FNAME)
-        with open(summary_path, "w") as f:
-            f.write(json_summary)
-        self._save_file(filenames.SUMMARY_FNAME)
+            self._fs.push(_SUMMARY_FNAME, json_summary)
+        self._pending_summary_json = json_summary
+        if time.time() - self._last_summary_write > self.SUMMARY_WRITE_SECONDS:
+            self._write_summary_file()
+
+    def _write_summary_file(self):
+        if self._pending_summary_json is None:
+            return
+        summary_path = os.path.join(self._settings.files_dir, _SUMMARY_FNAME)
+        data = self._pending_summary_json.encode("utf-8")
+        if hasattr(os, "pwrite"):
+            # reuse one fd across updates: an open/write/close cycle per
+            # summary is syscall-heavy at high update rates
+            if self._summary_fd is None:
+                self._summary_fd = os.open(
+                    summary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666
+                )
+            os.ftruncate(self._summary_fd, 0)
+            os.pwrite(self._summary_fd, data, 0)
+        else:
+            tmp_path = summary_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            _replace(tmp_path, summary_path)
+        self._pending_summary_json = None
+        self._last_summary_write = time.time()
+        self._save_file(_SUMMARY_FNAME)
 
     def send_stats(self, data):
         stats = data.stats
-        if stats.stats_type != wandb_internal_pb2.StatsRecord.StatsType.SYSTEM:
+        if stats.stats_type != _SYSTEM:
             return
         if not self._fs:
             return
         now = stats.timestamp.seconds
-        d = dict()
+        runtime = int(now - self._run.start_time.ToSeconds())
+        # value_json is already JSON: build the row textually, folding the
+        # "system" level into the key, so scalar items skip the
+        # json.loads/json.dumps round trip entirely
+        parts = []
+        nested = None
         for item in stats.item:
-            d[item.key] = json.loads(item.value_json)
-        row = dict(system=d)
-        self._flatten(row)
-        row["_wandb"] = True
-        row["_timestamp"] = now
-        row["_runtime"] = int(now - self._run.start_time.ToSeconds())
-        self._fs.push(filenames.EVENTS_FNAME, json.dumps(row))
+            value_json = item.value_json
+            if value_json[:1] == "{":
+                # rare dict-valued stat (eg. network); flatten via loads
+                if nested is None:
+                    nested = dict()
+                nested[item.key] = json.loads(value_json)
+                continue
+            parts.append(_dumps("system." + item.key))
+            parts.append(":")
+            parts.append(value_json)
+            parts.append(",")
+        if nested:
+            for k, v in self._flatten(dict(system=nested)).items():
+                parts.append(_dumps(k))
+                parts.append(":")
+                parts.append(_dumps(v))
+                parts.append(",")
+        parts.append('"_wandb":true,"_timestamp":%d,"_runtime":%d}' % (now, runtime))
+        self._push(_EVENTS_FNAME, "{" + "".join(parts))
         # TODO(jhr): check fs.push results?
 
     def send_output(self, data):
@@ -534,31 +743,52 @@ class SendManager(object):
         out = data.output
         prepend = ""
         stream = "stdout"
-        if out.output_type == wandb_internal_pb2.OutputRecord.OutputType.STDERR:
+        if out.output_type == _STDERR:
             stream = "stderr"
             prepend = "ERROR "
         line = out.line
-        if not line.endswith("\n"):
-            self._partial_output.setdefault(stream, "")
-            self._partial_output[stream] += line
+        if "\n" not in line:
+            # accumulate chunks in a list: repeated string concat would go
+            # quadratic on long lines without newlines (eg. progress bars)
+            self._partial_output.setdefault(stream, []).append(line)
             # TODO(jhr): how do we make sure this gets flushed?
             # we might need this for other stuff like telemetry
-        else:
-            # TODO(jhr): use time from timestamp proto
-            # TODO(jhr): do we need to make sure we write full lines?
-            # seems to be some issues with line breaks
-            cur_time = time.time()
-            timestamp = datetime.utcfromtimestamp(cur_time).isoformat() + " "
-            prev_str = self._partial_output.get(stream, "")
-            line = u"{}{}{}{}".format(prepend, timestamp, prev_str, line)
-            self._fs.push(filenames.OUTPUT_FNAME, line)
-            self._partial_output[stream] = ""
+            return
+        # TODO(jhr): use time from timestamp proto
+        cur_time = time.time()
+        sec = int(cur_time)
+        cached_sec, cached_str = self._ts_cache
+        if sec != cached_sec:
+            cached_str = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+            self._ts_cache = (sec, cached_str)
+        timestamp = u"{}.{:06d} ".format(cached_str, int((cur_time - sec) * 1e6))
+        prefix = prepend + timestamp
+        # a chunk can carry several newline-terminated lines; push each as
+        # it completes instead of buffering the whole chunk until its end.
+        # Split on "\n" only: splitlines() would also split on \r and
+        # friends and drop whatever follows a mid-chunk carriage return
+        prev = self._partial_output.get(stream)
+        segments = line.split("\n")
+        # the last element is the trailing partial ("" when the chunk ends
+        # at a newline); everything before it is a completed line
+        trailing = segments.pop()
+        for segment in segments:
+            segment += "\n"
+            if prev:
+                segment = u"".join(prev) + segment
+                del prev[:]
+            self._push(_OUTPUT_FNAME, prefix + segment)
+        if trailing:
+            self._partial_output.setdefault(stream, []).append(trailing)
 
     def send_config(self, data):
         cfg = data.config
         config_dict = config_util.dict_from_proto_list(cfg.update)
-        self._api.upsert_run(
-            name=self._run.run_id, config=config_dict, **self._api_settings
+        self._run_async(
+            self._api.upsert_run,
+            name=self._run.run_id,
+            config=config_dict,
+            **self._api_settings
         )
         config_path = os.path.join(self._settings.files_dir, "config.yaml")
         config_util.save_config_file_from_dict(config_path, config_dict)
@@ -571,9 +801,14 @@ class SendManager(object):
 
     def send_files(self, data):
         files = data.files
+        # TODO(jhr): fix paths with directories
+        policies = dict()
         for k in files.files:
-            # TODO(jhr): fix paths with directories
-            self._save_file(k.path, interface.file_enum_to_policy(k.policy))
+            policies[k.path] = interface.file_enum_to_policy(k.policy)
+        logger.info("saving %d files", len(policies))
+        if self._dir_watcher:
+            # one batched call so the watcher walks its state once
+            self._dir_watcher.update_policies(policies)
 
     def send_header(self, data):
         pass
@@ -586,6 +821,8 @@ class SendManager(object):
         pass
 
     def send_artifact(self, data):
+        from . import artifacts
+
         artifact = data.artifact
         saver = artifacts.ArtifactSaver(
             api=self._api,
@@ -606,14 +843,15 @@ class SendManager(object):
         )
 
     def send_alert(self, data):
-        alert = data.alert
-        _, server_info = self._api.viewer_server_info()
-        max_cli_version = server_info.get("cliVersionInfo", {}).get(
+        self._run_async(self._do_alert, data.alert)
+
+    def _do_alert(self, alert):
+        if self._cached_server_info is None:
+            _, self._cached_server_info = self._api.viewer_server_info()
+        max_cli_version = self._cached_server_info.get("cliVersionInfo", {}).get(
             "max_cli_version", None
         )
-        if max_cli_version is None or parse_version(max_cli_version) < parse_version(
-            "0.10.9"
-        ):
+        if max_cli_version is None or parse_version(max_cli_version) < _MIN_ALERT_CLI:
             logger.warning(
                 "This W&B server doesn't support alerts, "
                 "have your administrator install wandb/local >= 0.9.31"
@@ -630,6 +868,14 @@ class SendManager(object):
         logger.info("shutting down sender")
         # if self._tb_watcher:
         #     self._tb_watcher.finish()
+        if self._net_thread is not None:
+            self._net_q.put(None)
+            self._net_thread.join()
+            self._net_thread = None
+        self._write_summary_file()
+        if self._summary_fd is not None:
+            os.close(self._summary_fd)
+            self._summary_fd = None
         if self._dir_watcher:
             self._dir_watcher.finish()
             self._dir_watcher = None
@@ -638,5 +884,6 @@ class SendManager(object):
             self._pusher.join()
             self._pusher = None
         if self._fs:
+            self._flush_push()
             self._fs.finish(self._exit_code)
             self._fs = None
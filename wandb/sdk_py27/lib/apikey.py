@@ -5,14 +5,13 @@ apikey util.
 
 import getpass
 import os
+import re
 import stat
 import sys
 import textwrap
 
-import requests
 from six.moves import input
 import wandb
-from wandb.apis import InternalApi
 from wandb.errors import term
 from wandb.util import isatty
 
@@ -22,6 +21,11 @@ LOGIN_CHOICE_NEW = "Create a W&B account"
 LOGIN_CHOICE_EXISTS = "Use an existing W&B account"
 LOGIN_CHOICE_DRYRUN = "Don't visualize my results"
 LOGIN_CHOICE_NOTTY = "Unconfigured"
+try:
+    _replace = os.replace
+except AttributeError:  # py2 has no atomic replace, fall back to rename
+    _replace = os.rename
+
 LOGIN_CHOICES = [
     LOGIN_CHOICE_ANON,
     LOGIN_CHOICE_NEW,
@@ -29,6 +33,33 @@ LOGIN_CHOICES = [
     LOGIN_CHOICE_DRYRUN,
 ]
 
+# Pulls the bare hostname out of "scheme://user@host:port/path" style urls
+_HOST_RE = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*://)?(?:[^/@]+@)?([^/:@]+)")
+
+# Matches the "machine <host> login <user> password <key>" entries we write
+# (whitespace may include newlines, covering the indented multi-line form)
+_NETRC_ENTRY_RE = re.compile(r"machine\s+(\S+)\s+login\s+(\S+)\s+password\s+(\S+)")
+
+
+# isatty is an ioctl per call; stdout/stdin don't get swapped out from under
+# us during a login flow, so the results are cached for the process lifetime.
+_stdout_tty = None
+_stdin_tty = None
+
+
+def _is_stdout_tty():
+    global _stdout_tty
+    if _stdout_tty is None:
+        _stdout_tty = isatty(sys.stdout)
+    return _stdout_tty
+
+
+def _is_stdin_tty():
+    global _stdin_tty
+    if _stdin_tty is None:
+        _stdin_tty = isatty(sys.stdin)
+    return _stdin_tty
+
 
 def _fixup_anon_mode(default):
     # Convert weird anonymode values from legacy settings files
@@ -61,6 +92,8 @@ def prompt_api_key(  # noqa: C901
         None - if dryrun is selected
         False - if unconfigured (notty)
     """
+    from wandb.apis import InternalApi
+
     input_callback = input_callback or getpass.getpass
     log_string = term.LOG_STRING
     api = api or InternalApi()
@@ -87,7 +120,7 @@ def prompt_api_key(  # noqa: C901
     if anon_mode == "must":
         result = LOGIN_CHOICE_ANON
     # If we're not in an interactive environment, default to dry-run.
-    elif not jupyter and (not isatty(sys.stdout) or not isatty(sys.stdin)):
+    elif not jupyter and (not _is_stdout_tty() or not _is_stdin_tty()):
         result = LOGIN_CHOICE_NOTTY
     elif local:
         result = LOGIN_CHOICE_EXISTS
@@ -159,7 +192,8 @@ def write_netrc(host, entity, key):
         )
         return None
     try:
-        normalized_host = host.rstrip("/").split("/")[-1].split(":")[0]
+        m = _HOST_RE.match(host)
+        normalized_host = m.group(1) if m else host
         if normalized_host != "localhost" and "." not in normalized_host:
             wandb.termerror("Host must be a url in the form https://some.address.com")
             return None
@@ -168,37 +202,37 @@ def write_netrc(host, entity, key):
                 normalized_host, os.path.expanduser("~/.netrc")
             )
         )
-        machine_line = "machine %s" % normalized_host
         path = os.path.expanduser("~/.netrc")
-        orig_lines = None
         try:
             with open(path) as f:
-                orig_lines = f.read().strip().split("\n")
+                buf = f.read()
         except IOError:
-            pass
-        with open(path, "w") as f:
-            if orig_lines:
-                # delete this machine from the file if it's already there.
-                skip = 0
-                for line in orig_lines:
-                    # we fix invalid netrc files with an empty host that we wrote before
-                    # verifying host...
-                    if line == "machine " or machine_line in line:
-                        skip = 2
-                    elif skip:
-                        skip -= 1
-                    else:
-                        f.write("%s\n" % line)
-            f.write(
-                textwrap.dedent(
-                    """\
-            machine {host}
-              login {entity}
-              password {key}
-            """
-                ).format(host=normalized_host, entity=entity, key=key)
+            buf = ""
+        # Excise any existing entry for this machine in one pass rather than
+        # rewriting line by line with a skip counter. This also drops the
+        # invalid empty-host entries we used to write before verifying host.
+        pat = re.compile(
+            r"(?m)^machine[ \t]+(?:{}\b.*)?$(?:\n[ \t]+.*)*\n?".format(
+                re.escape(normalized_host)
             )
-        os.chmod(os.path.expanduser("~/.netrc"), stat.S_IRUSR | stat.S_IWUSR)
+        )
+        contents = pat.sub("", buf).strip()
+        if contents:
+            contents += "\n"
+        contents += textwrap.dedent(
+            """\
+        machine {host}
+          login {entity}
+          password {key}
+        """
+        ).format(host=normalized_host, entity=entity, key=key)
+        # write a sibling temp file and swap it in atomically so a crash
+        # mid-write can't truncate the netrc file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(contents)
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR)
+        _replace(tmp_path, path)
         return True
     except IOError:
         wandb.termerror("Unable to read ~/.netrc")
@@ -219,12 +253,49 @@ def write_key(settings, key):
     raise ValueError("API key must be 40 characters long, yours was %s" % len(key))
 
 
+# api_key() can get called several times in a single process; cache netrc
+# lookups so repeat calls don't re-open and re-parse ~/.netrc. The cache is
+# keyed on the file's mtime, so updates through write_netrc invalidate it
+# naturally.
+_netrc_cache = dict()
+
+
+def _parse_netrc_key(path, host):
+    """Find host's password in the netrc file with a single scan.
+
+    The stdlib netrc parser (behind requests' get_netrc_auth) stats the
+    file and looks up the owner once per non-anonymous entry, which
+    dominates startup for machines with large netrc files. One read and
+    one regex scan covers the entries we care about.
+    """
+    try:
+        with open(path) as f:
+            text = f.read()
+    except (IOError, OSError):
+        return None
+    for m in _NETRC_ENTRY_RE.finditer(text):
+        if m.group(1) == host:
+            return m.group(3)
+    return None
+
+
+def _netrc_api_key(base_url):
+    path = os.path.expanduser("~/.netrc")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cache_key = (base_url, mtime)
+    if cache_key not in _netrc_cache:
+        m = _HOST_RE.match(base_url)
+        host = m.group(1) if m else base_url
+        _netrc_cache[cache_key] = _parse_netrc_key(path, host)
+    return _netrc_cache[cache_key]
+
+
 def api_key(settings=None):
     if not settings:
         settings = wandb.setup().settings
     if settings.api_key:
         return settings.api_key
-    auth = requests.utils.get_netrc_auth(settings.base_url)
-    if auth:
-        return auth[-1]
-    return None
+    return _netrc_api_key(settings.base_url)
@@ -4,5 +4,29 @@ import json
 def dict_from_proto_list(obj_list):
     d = dict()
     for item in obj_list:
-        d[item.key] = json.loads(item.value_json)
+        v = item.value_json
+        # Most history values are plain numbers; decode those directly
+        # instead of paying for a full JSON parse per item
+        if v and v[0] in "-0123456789":
+            try:
+                if "." in v or "e" in v or "E" in v:
+                    d[item.key] = float(v)
+                else:
+                    d[item.key] = int(v)
+                continue
+            except ValueError:
+                pass
+        d[item.key] = json.loads(v)
     return d
+
+
+def json_from_proto_list(obj_list):
+    """Serialize a proto item list straight to a JSON object string.
+
+    Each item's value_json is already JSON text, so it can be concatenated
+    verbatim without the decode/re-encode round trip (and intermediate
+    dict) of dict_from_proto_list followed by json.dumps.
+    """
+    return "{%s}" % ",".join(
+        "%s:%s" % (json.dumps(item.key), item.value_json) for item in obj_list
+    )
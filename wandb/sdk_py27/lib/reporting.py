@@ -8,6 +8,16 @@ logger = logging.getLogger("wandb")
 
 
 class _Reporter(object):
+
+    __slots__ = (
+        "_settings",
+        "_errors",
+        "_warnings",
+        "_num_errors",
+        "_num_warnings",
+        "_context",
+    )
+
     def __init__(self, settings):
         self._settings = settings
         self._errors = []
@@ -22,17 +32,21 @@ class _Reporter(object):
     def warning(self, __s, *args):
         show = self._settings.show_warnings
         summary = self._settings.summary_warnings
-        if show is not None or summary is not None:
-            s = __s % args
         self._num_warnings += 1
-        if show is not None:
-            if self._num_warnings <= show or show == 0:
-                print("[WARNING]", s)
-                if self._num_warnings == show:
-                    print("not showing any more warnings")
-        if summary is not None:
-            if self._num_warnings <= summary or summary == 0:
-                self._warnings.append(s)
+        num = self._num_warnings
+        will_show = show is not None and (num <= show or show == 0)
+        will_store = summary is not None and (num <= summary or summary == 0)
+        # skip %-formatting once both caps are exceeded; noisy training
+        # loops can emit warnings per step long after we stopped showing them
+        if not (will_show or will_store):
+            return
+        s = __s % args
+        if will_show:
+            print("[WARNING]", s)
+            if num == show:
+                print("not showing any more warnings")
+        if will_store:
+            self._warnings.append(s)
 
     def info(self, __s, *args):
         if self._settings.show_info:
@@ -74,6 +88,8 @@ class _Reporter(object):
 
 
 class Reporter(object):
+    # all state lives on the class-level _instance singleton
+    __slots__ = ()
     _instance = None
 
     def __init__(self, settings=None):
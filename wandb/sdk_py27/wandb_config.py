@@ -5,6 +5,7 @@ config.
 """
 
 import logging
+import os
 
 try:
     from collections.abc import Sequence
@@ -21,6 +22,19 @@ from .lib import config_util
 
 logger = logging.getLogger("wandb")
 
+# Bound once at import: wandb.termwarn exists before the sdk package is
+# imported, and sweeps can hit __setitem__ thousands of times
+_termwarn = wandb.termwarn
+
+# Values of these exact types pass through _sanitize_val unchanged
+_SAFE_TYPES = (int, float, bool, str, type(None))
+
+# Whether config-defaults.yaml exists is checked once per working
+# directory: the file doesn't appear mid-run and most runs don't use one,
+# so repeat Config() constructions shouldn't pay a stat plus failed open
+# each time. Keyed on cwd because tests (and users) chdir between runs.
+_defaults_checked = dict()
+
 
 # TODO(jhr): consider a callback for persisting changes?
 # if this is done right we might make sure this is pickle-able
@@ -93,14 +107,34 @@ class Config(object):
         ```
     """
 
+    # Fixed attribute set: a slots layout drops the per-instance __dict__
+    # and makes the internal-attribute reads in the hot accessors cheaper
+    __slots__ = (
+        "_items",
+        "_public_items",
+        "_locked",
+        "_users",
+        "_users_inv",
+        "_users_cnt",
+        "_callback",
+        "_settings",
+        "_log_info",
+    )
+
     def __init__(self):
         object.__setattr__(self, "_items", dict())
+        # mirror of _items without underscore-prefixed keys, maintained on
+        # write so keys()/items() don't re-filter the whole dict per access
+        object.__setattr__(self, "_public_items", dict())
         object.__setattr__(self, "_locked", dict())
         object.__setattr__(self, "_users", dict())
         object.__setattr__(self, "_users_inv", dict())
         object.__setattr__(self, "_users_cnt", 0)
         object.__setattr__(self, "_callback", None)
         object.__setattr__(self, "_settings", None)
+        # evaluated once; per-set logging shouldn't pay the level check
+        # plus argument marshalling when INFO is off (the production default)
+        object.__setattr__(self, "_log_info", logger.isEnabledFor(logging.INFO))
 
         self._load_defaults()
 
@@ -114,7 +148,7 @@ class Config(object):
         return str(dict(self))
 
     def keys(self):
-        return [k for k in self._items.keys() if not k.startswith("_")]
+        return self._public_items.keys()
 
     def _as_dict(self):
         return self._items
@@ -129,15 +163,18 @@ class Config(object):
     def __setitem__(self, key, val):
         key, val = self._sanitize(key, val)
         if key in self._locked:
-            wandb.termwarn("Config item '%s' was locked." % key)
+            _termwarn("Config item '%s' was locked." % key)
             return
         self._items[key] = val
-        logger.info("config set %s = %s - %s", key, val, self._callback)
+        if not key.startswith("_"):
+            self._public_items[key] = val
+        if self._log_info:
+            logger.info("config set %s = %s - %s", key, val, self._callback)
         if self._callback:
             self._callback(key=key, val=val, data=self._as_dict())
 
     def items(self):
-        return [(k, v) for k, v in self._items.items() if not k.startswith("_")]
+        return self._public_items.items()
 
     __setattr__ = __setitem__
 
@@ -151,6 +188,9 @@ class Config(object):
         parsed_dict = wandb_helper.parse_config(d)
         sanitized = self._sanitize_dict(parsed_dict, allow_val_change)
         self._items.update(sanitized)
+        for k, v in six.iteritems(sanitized):
+            if not k.startswith("_"):
+                self._public_items[k] = v
 
     def update(self, d, allow_val_change=None):
         self._update(d, allow_val_change)
@@ -170,6 +210,8 @@ class Config(object):
         d = self._sanitize_dict(d)
         for k, v in six.iteritems(d):
             self._items.setdefault(k, v)
+            if not k.startswith("_"):
+                self._public_items[k] = self._items[k]
         if self._callback:
             self._callback(data=self._as_dict())
 
@@ -186,8 +228,16 @@ class Config(object):
             k, v = self._sanitize(k, v)
             self._locked[k] = num
             self._items[k] = v
+            if not k.startswith("_"):
+                self._public_items[k] = v
 
     def _load_defaults(self):
+        cwd = os.getcwd()
+        exists = _defaults_checked.get(cwd)
+        if exists is None:
+            exists = _defaults_checked[cwd] = os.path.isfile("config-defaults.yaml")
+        if not exists:
+            return
         conf_dict = config_util.dict_from_config_file("config-defaults.yaml")
         if conf_dict is not None:
             self.update(conf_dict)
@@ -221,26 +271,44 @@ class Config(object):
 
     def _sanitize_val(self, val):
         """Turn all non-builtin values into something safe for YAML"""
-        if isinstance(val, dict):
-            converted = {}
-            for key, value in six.iteritems(val):
-                converted[key] = self._sanitize_val(value)
-            return converted
-        if isinstance(val, slice):
-            converted = dict(
-                slice_start=val.start, slice_step=val.step, slice_stop=val.stop
-            )
-            return converted
-        val, _ = json_friendly(val)
-        if isinstance(val, Sequence) and not isinstance(val, six.string_types):
-            converted = []
-            for value in val:
-                converted.append(self._sanitize_val(value))
-            return converted
-        else:
+        # Exact-type check up front: scalars are the overwhelmingly common
+        # case and shouldn't pay for the ABC and module checks below
+        if type(val) in _SAFE_TYPES:
+            return val
+        # Iterative walk over an explicit stack: deeply nested configs
+        # shouldn't pay a Python call per node or risk RecursionError
+        result = [None]
+        stack = [(val, result, 0)]
+        while stack:
+            val, container, key = stack.pop()
+            if isinstance(val, dict):
+                converted = {}
+                container[key] = converted
+                for k, v in six.iteritems(val):
+                    if type(v) in _SAFE_TYPES:
+                        converted[k] = v
+                    else:
+                        stack.append((v, converted, k))
+                continue
+            if isinstance(val, slice):
+                container[key] = dict(
+                    slice_start=val.start, slice_step=val.step, slice_stop=val.stop
+                )
+                continue
+            val, _ = json_friendly(val)
+            if isinstance(val, Sequence) and not isinstance(val, six.string_types):
+                converted = [None] * len(val)
+                container[key] = converted
+                for i, v in enumerate(val):
+                    if type(v) in _SAFE_TYPES:
+                        converted[i] = v
+                    else:
+                        stack.append((v, converted, i))
+                continue
             if val.__class__.__module__ not in ("builtins", "__builtin__"):
                 val = str(val)
-            return val
+            container[key] = val
+        return result[0]
 
 
 class ConfigStatic(object):
@@ -887,6 +887,11 @@ def async_call(target, timeout=None):
 
 
 def read_many_from_queue(q, max_items, queue_timeout):
+    """Block up to queue_timeout for one item, then drain without blocking.
+
+    Only the first get can sleep; the rest use get_nowait so an idle queue
+    costs one wakeup per timeout and a busy one is drained in a single pass.
+    """
     try:
         item = q.get(True, queue_timeout)
     except queue.Empty:
@@ -1,17 +1,19 @@
+import collections
+import concurrent.futures
 import json
 import logging
 import multiprocessing
 import os
 import platform
+import queue
 import signal
 import socket
 import subprocess
 import sys
+import threading
 import time
 import traceback
 
-import six
-from six.moves import queue
 import wandb
 from wandb import util
 from wandb import wandb_lib
@@ -22,6 +24,14 @@ import yaml
 
 logger = logging.getLogger(__name__)
 
+# the platform cannot change while we run; resolve it (and the popen
+# kwargs that depend on it) once instead of on every call
+_IS_WINDOWS = platform.system() == "Windows"
+if _IS_WINDOWS:
+    _POPEN_KWARGS = dict(creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+else:
+    _POPEN_KWARGS = dict(preexec_fn=os.setpgrp)
+
 
 class AgentError(Exception):
     pass
@@ -30,30 +40,51 @@ class AgentError(Exception):
 class AgentProcess(object):
     """Launch and manage a process."""
 
+    __slots__ = ("_popen", "_proc", "last_sigterm_time")
+
     def __init__(
-        self, env=None, command=None, function=None, run_id=None, in_jupyter=None
+        self,
+        env=None,
+        command=None,
+        function=None,
+        run_id=None,
+        in_jupyter=None,
+        finished_q=None,
     ):
         self._popen = None
         self._proc = None
-        self._finished_q = multiprocessing.Queue()
-        self._proc_killed = False
+        # when we sent the sigterm, to give the process a chance to handle
+        # the signal before sending sigkill every heartbeat
+        self.last_sigterm_time = None
 
         if command:
-            if platform.system() == "Windows":
-                kwargs = dict(creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
-            else:
-                kwargs = dict(preexec_fn=os.setpgrp)
-            self._popen = subprocess.Popen(command, env=env, **kwargs)
+            self._popen = subprocess.Popen(command, env=env, **_POPEN_KWARGS)
         elif function:
             self._proc = multiprocessing.Process(
-                target=self._start,
-                args=(self._finished_q, env, function, run_id, in_jupyter),
+                target=self._start, args=(env, function, run_id, in_jupyter),
             )
             self._proc.start()
         else:
             raise AgentError("Agent Process requires command or function")
 
-    def _start(self, finished_q, env, function, run_id, in_jupyter):
+        if finished_q is not None:
+            # one waiting thread per child lets the agent block on a single
+            # shared queue instead of polling every live process each tick
+            reaper = threading.Thread(target=self._reap, args=(finished_q, run_id))
+            reaper.daemon = True
+            reaper.start()
+
+    def _reap(self, finished_q, run_id):
+        if self._popen:
+            exitcode = self._popen.wait()
+        else:
+            self._proc.join()
+            # function-mode exits were never counted as failures (poll()
+            # reported a plain True); preserve that by reporting 0
+            exitcode = 0
+        finished_q.put((run_id, exitcode))
+
+    def _start(self, env, function, run_id, in_jupyter):
         if env:
             for k, v in env.items():
                 os.environ[k] = v
@@ -67,51 +98,38 @@ class AgentProcess(object):
         if run := wandb.run:
             wandb.join()
 
-        # signal that the process is finished
-        finished_q.put(True)
-
     def poll(self):
         if self._popen:
             return self._popen.poll()
-        if self._proc_killed:
-            # we need to join process to prevent zombies
-            self._proc.join()
-            return True
-        try:
-            if finished := self._finished_q.get(False, 0):
-                return True
-        except queue.Empty:
-            pass
-        return
+        # exitcode reaps the child if it has exited (waitpid under the
+        # hood), so no explicit join is needed for killed processes
+        return True if self._proc.exitcode is not None else None
 
     def wait(self):
         if not self._popen:
             return self._proc.join()
-        # if on windows, wait() will block and we wont be able to interrupt
-        if platform.system() == "Windows":
-            try:
-                while True:
-                    p = self._popen.poll()
-                    if p is not None:
-                        return p
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                raise
+        # on windows, an untimed wait() can't be interrupted by ctrl-c, so
+        # block in short OS-level waits instead: the process is reaped the
+        # moment it exits rather than being polled once a second
+        if _IS_WINDOWS:
+            while True:
+                try:
+                    return self._popen.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    continue
         return self._popen.wait()
 
     def kill(self):
         if self._popen:
             return self._popen.kill()
         if pid := self._proc.pid:
-            ret = os.kill(pid, signal.SIGKILL)
-            self._proc_killed = True
-            return ret
+            return os.kill(pid, signal.SIGKILL)
         return
 
     def terminate(self):
         if self._popen:
             # windows terminate is too strong, send Ctrl-C instead
-            if platform.system() == "Windows":
+            if _IS_WINDOWS:
                 return self._popen.send_signal(signal.CTRL_C_EVENT)
             return self._popen.terminate()
         return self._proc.terminate()
@@ -119,6 +137,7 @@ class AgentProcess(object):
 
 class Agent(object):
     POLL_INTERVAL = 5
+    DEFAULT_SWEEP_COMMAND = ["${env}", "${interpreter}", "${program}", "${args}"]
     REPORT_INTERVAL = 0
     KILL_DELAY = 30
     FLAPPING_MAX_SECONDS = 60
@@ -132,9 +151,22 @@ class Agent(object):
         self._queue = queue
         self._run_processes = {}  # keyed by run.id (GQL run name)
         self._server_responses = []
+        # serializes _run_processes mutations when heartbeat commands are
+        # processed on the spawn pool
+        self._process_lock = threading.Lock()
+        # single worker that writes each run's config file while the rest
+        # of run setup proceeds; its worker thread starts on first use
+        self._config_write_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1
+        )
         self._sweep_id = sweep_id
         self._in_jupyter = in_jupyter
-        self._log = []
+        # bounded: entries are only ever appended, never read back, so old
+        # ones must not pin resp_queue proxies and grow without limit
+        self._log = collections.deque(maxlen=1024)
+        # completed runs announce themselves here (run_id, exitcode); the
+        # run loop drains it instead of polling every child per tick
+        self._finished_q = multiprocessing.Queue()
         self._running = True
         self._last_report_time = None
         self._function = function
@@ -146,6 +178,7 @@ class Agent(object):
         self._failed = 0
         self._count = count
         self._sweep_command = []
+        self._command_template = []
         self._max_initial_failures = wandb.env.get_agent_max_initial_failures(
             self.MAX_INITIAL_FAILURES
         )
@@ -156,6 +189,10 @@ class Agent(object):
         # if the directory to log to is not set, set it
         if os.environ.get("WANDB_DIR") is None:
             os.environ["WANDB_DIR"] = os.path.abspath(os.getcwd())
+        # per-run variables are passed to children explicitly, so the agent's
+        # environment can be snapshotted once instead of mutated and re-copied
+        # for every run
+        self._base_env = dict(os.environ)
 
     def is_flapping(self):
         """Flapping occurs if the agents receives FLAPPING_MAX_FAILURES non-0
@@ -180,35 +217,76 @@ class Agent(object):
                     if sweep_command and isinstance(sweep_command, list):
                         self._sweep_command = sweep_command
 
+        # the command template is fixed for the life of the sweep; classify
+        # the ${var} placeholders once rather than re-scanning every run
+        self._command_template = [
+            ("var", c[2:-1]) if c.startswith("${") and c.endswith("}") else ("lit", c)
+            for c in (str(c) for c in self._sweep_command or self.DEFAULT_SWEEP_COMMAND)
+        ]
+        self._needs_args_json = any(
+            kind == "var" and name in ("args_json", "args_json_file")
+            for kind, name in self._command_template
+        )
+
+        # every run's config files land in the same sweep directory; build
+        # and create it once instead of per run
+        # TODO(jhr): move into settings
+        sweep_id = self._base_env.get(wandb.env.SWEEP_ID)
+        self._sweep_dir = os.path.join("wandb", "sweep-" + sweep_id)
+        os.makedirs(self._sweep_dir, exist_ok=True)
+
         # TODO: include sweep ID
         agent = self._api.register_agent(socket.gethostname(), sweep_id=self._sweep_id)
         agent_id = agent["id"]
 
+        # values read every tick but never written inside the loop; bind
+        # them once so the loop does local loads instead of attribute lookups
+        command_queue = self._queue
+        poll_interval = self.POLL_INTERVAL
+        report_interval = self._report_interval
+        finished_q = self._finished_q
+
+        # created on first multi-command heartbeat; subprocess spawning
+        # releases the GIL, so batched run commands start near-in-parallel
+        spawn_pool = None
+
         try:
             while self._running:
                 commands = util.read_many_from_queue(
-                    self._queue, 100, self.POLL_INTERVAL
+                    command_queue, 100, poll_interval
                 )
-                for command in commands:
-                    command["resp_queue"].put(self._process_command(command))
+                # process the whole drained batch before responding: each
+                # resp_queue.put can be a pickle+pipe roundtrip, so they are
+                # issued together after the local work is done. Commands are
+                # processed in arrival order; bucketing by type would reorder
+                # run/stop sequences.
+                responses = [
+                    (command["resp_queue"], self._process_command(command))
+                    for command in commands
+                ]
+                for resp_queue, response in responses:
+                    resp_queue.put(response)
 
                 now = util.stopwatch_now()
                 if self._last_report_time is None or (
-                    self._report_interval != 0
-                    and now > self._last_report_time + self._report_interval
+                    report_interval != 0
+                    and now > self._last_report_time + report_interval
                 ):
                     logger.info("Running runs: %s", list(self._run_processes.keys()))
                     self._last_report_time = now
-                run_status = {}
-                for run_id, run_process in list(six.iteritems(self._run_processes)):
-                    poll_result = run_process.poll()
-                    if poll_result is None:
-                        run_status[run_id] = True
+                # completed runs announce themselves on the shared queue;
+                # drain it instead of polling every live process
+                while True:
+                    try:
+                        run_id, exit_code = finished_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if run_id not in self._run_processes:
                         continue
-                    elif (
-                        not isinstance(poll_result, bool)
-                        and isinstance(poll_result, int)
-                        and poll_result > 0
+                    if (
+                        not isinstance(exit_code, bool)
+                        and isinstance(exit_code, int)
+                        and exit_code > 0
                     ):
                         self._failed += 1
                         if self.is_flapping():
@@ -236,6 +314,7 @@ class Agent(object):
                     del self._run_processes[run_id]
                     self._last_report_time = None
                     self._finished += 1
+                run_status = {run_id: True for run_id in self._run_processes}
 
                 if self._count and self._finished >= self._count or not self._running:
                     self._running = False
@@ -244,33 +323,49 @@ class Agent(object):
                 commands = self._api.agent_heartbeat(agent_id, {}, run_status)
 
                 # TODO: send _server_responses
-                self._server_responses = [
-                    self._process_command(command) for command in commands
-                ]
+                if len(commands) > 1:
+                    if spawn_pool is None:
+                        spawn_pool = concurrent.futures.ThreadPoolExecutor(
+                            max_workers=min(32, (os.cpu_count() or 1) * 2)
+                        )
+                    # results are gathered before the loop continues, so the
+                    # rest of the tick never races against the pool
+                    futures = [
+                        spawn_pool.submit(self._process_command, command)
+                        for command in commands
+                    ]
+                    self._server_responses = [f.result() for f in futures]
+                else:
+                    self._server_responses = [
+                        self._process_command(command) for command in commands
+                    ]
 
         except KeyboardInterrupt:
             try:
                 wandb.termlog(
                     "Ctrl-c pressed. Waiting for runs to end. Press ctrl-c again to terminate them."
                 )
-                for _, run_process in six.iteritems(self._run_processes):
+                for _, run_process in self._run_processes.items():
                     run_process.wait()
             except KeyboardInterrupt:
                 pass
         finally:
+            if spawn_pool is not None:
+                spawn_pool.shutdown(wait=True)
+            self._config_write_pool.shutdown(wait=True)
             try:
                 if not self._in_jupyter:
                     wandb.termlog("Terminating and syncing runs. Press ctrl-c to kill.")
-                for _, run_process in six.iteritems(self._run_processes):
+                for _, run_process in self._run_processes.items():
                     try:
                         run_process.terminate()
                     except OSError:
                         pass  # if process is already dead
-                for _, run_process in six.iteritems(self._run_processes):
+                for _, run_process in self._run_processes.items():
                     run_process.wait()
             except KeyboardInterrupt:
                 wandb.termlog("Killing runs and quitting.")
-                for _, run_process in six.iteritems(self._run_processes):
+                for _, run_process in self._run_processes.items():
                     try:
                         run_process.kill()
                     except OSError:
@@ -304,68 +399,59 @@ class Agent(object):
             response["traceback"] = traceback.format_tb(tb)
             del tb
 
-        self._log.append((command, response))
+        self._log.append(
+            ({k: v for k, v in command.items() if k != "resp_queue"}, response)
+        )
 
         return response
 
     def _command_run(self, command):
-        logger.info(
-            "Agent starting run with config:\n"
-            + "\n".join(
-                ["\t{}: {}".format(k, v["value"]) for k, v in command["args"].items()]
-            )
-        )
+        run_id = command.get("run_id")
+        # single pass over the args builds the log text and the flag pairs
+        config_lines = []
+        flags_list = []
+        for param, config in command["args"].items():
+            config_lines.append("\t{}: {}".format(param, config["value"]))
+            flags_list.append((param, config["value"]))
+        config_text = "\n".join(config_lines)
+        logger.info("Agent starting run with config:\n" + config_text)
         if self._in_jupyter:
             print(
-                "wandb: Agent Starting Run: {} with config:\n".format(
-                    command.get("run_id")
-                )
-                + "\n".join(
-                    [
-                        "\t{}: {}".format(k, v["value"])
-                        for k, v in command["args"].items()
-                    ]
-                )
+                "wandb: Agent Starting Run: {} with config:\n".format(run_id)
+                + config_text
             )
 
-        # setup default sweep command if not configured
-        sweep_command = self._sweep_command or [
-            "${env}",
-            "${interpreter}",
-            "${program}",
-            "${args}",
-        ]
-
-        run_id = command.get("run_id")
-        sweep_id = os.environ.get(wandb.env.SWEEP_ID)
-        # TODO(jhr): move into settings
-        config_file = os.path.join(
-            "wandb", "sweep-" + sweep_id, f'config-{run_id}.yaml'
-        )
-
-        json_file = os.path.join("wandb", f'sweep-{sweep_id}', f'config-{run_id}.json')
-
-        os.environ[wandb.env.RUN_ID] = run_id
-        os.environ[wandb.env.CONFIG_PATHS] = os.path.join(
-            os.environ.get(wandb.env.DIR), config_file
-        )
-        wandb_lib.config_util.save_config_file_from_dict(
-            os.environ[wandb.env.CONFIG_PATHS], command["args"]
+        config_file = os.path.join(self._sweep_dir, f'config-{run_id}.yaml')
+        json_file = os.path.join(self._sweep_dir, f'config-{run_id}.json')
+
+        config_path = os.path.join(self._base_env.get(wandb.env.DIR), config_file)
+        # the child reads this file from wandb.init in both function and
+        # subprocess mode, but nothing in this process does: overlap the
+        # disk write with the rest of run setup and wait for it just
+        # before the child is spawned
+        config_future = self._config_write_pool.submit(
+            wandb_lib.config_util.save_config_file_from_dict,
+            config_path,
+            command["args"],
         )
 
-        env = dict(os.environ)
+        env = dict(self._base_env)
+        env[wandb.env.RUN_ID] = run_id
+        env[wandb.env.CONFIG_PATHS] = config_path
 
-        flags_list = [
-            (param, config["value"]) for param, config in command["args"].items()
-        ]
         flags_no_hyphens = ["{}={}".format(param, value) for param, value in flags_list]
         flags = [f'--{flag}' for flag in flags_no_hyphens]
-        flags_dict = dict(flags_list)
-        flags_json = json.dumps(flags_dict)
+        # the json form of the args is only needed when the command template
+        # actually references it
+        flags_json = json.dumps(dict(flags_list)) if self._needs_args_json else None
+
+        if ("var", "args_json_file") in self._command_template:
+            with open(json_file, "wb") as fp:
+                fp.write(flags_json.encode("utf-8"))
 
-        if "${args_json_file}" in sweep_command:
-            with open(json_file, "w") as fp:
-                fp.write(flags_json)
+        # re-raises a failed write here, so it still fails the run command
+        # instead of spawning a child against a missing config file
+        config_future.result()
 
         if self._function:
             # make sure that each run regenerates setup singleton
@@ -375,6 +461,7 @@ class Agent(object):
                 env=env,
                 run_id=run_id,
                 in_jupyter=self._in_jupyter,
+                finished_q=self._finished_q,
             )
         else:
             sweep_vars = dict(
@@ -386,33 +473,32 @@ class Agent(object):
                 args_json_file=[json_file],
                 env=["/usr/bin/env"],
             )
-            if platform.system() == "Windows":
+            if _IS_WINDOWS:
                 del sweep_vars["env"]
             command_list = []
-            for c in sweep_command:
-                c = str(c)
-                if c.startswith("${") and c.endswith("}"):
-                    replace_list = sweep_vars.get(c[2:-1])
-                    command_list += replace_list or []
+            for kind, c in self._command_template:
+                if kind == "var":
+                    command_list += sweep_vars.get(c) or []
                 else:
-                    command_list += [c]
+                    command_list.append(c)
             logger.info(
                 "About to run command: {}".format(
                     " ".join('"%s"' % c if " " in c else c for c in command_list)
                 )
             )
-            proc = AgentProcess(command=command_list, env=env)
-        self._run_processes[run_id] = proc
-
-        # we keep track of when we sent the sigterm to give processes a chance
-        # to handle the signal before sending sigkill every heartbeat
-        self._run_processes[run_id].last_sigterm_time = None
+            proc = AgentProcess(
+                command=command_list, env=env, run_id=run_id,
+                finished_q=self._finished_q,
+            )
+        with self._process_lock:
+            self._run_processes[run_id] = proc
         self._last_report_time = None
 
     def _command_stop(self, command):
         run_id = command["run_id"]
-        if run_id in self._run_processes:
-            proc = self._run_processes[run_id]
+        with self._process_lock:
+            proc = self._run_processes.get(run_id)
+        if proc is not None:
             now = util.stopwatch_now()
             if proc.last_sigterm_time is None:
                 proc.last_sigterm_time = now
@@ -432,7 +518,9 @@ class Agent(object):
 
     def _command_exit(self, command):
         logger.info("Received exit command. Killing runs and quitting.")
-        for _, proc in six.iteritems(self._run_processes):
+        with self._process_lock:
+            procs = list(self._run_processes.values())
+        for proc in procs:
             try:
                 proc.kill()
             except OSError:
@@ -445,16 +533,24 @@ class AgentApi(object):
     def __init__(self, queue):
         self._queue = queue
         self._command_id = 0
-        self._multiproc_manager = multiprocessing.Manager()
+        self._multiproc_manager = None
+        self._resp_queue = None
 
     def command(self, command):
+        if self._resp_queue is None:
+            # a plain multiprocessing.Queue can't be pickled into another
+            # queue, so a manager proxy is required for the response path.
+            # Spawn the manager's helper process lazily and reuse a single
+            # response queue: commands are strictly put-then-blocking-get,
+            # so it never holds more than one response
+            self._multiproc_manager = multiprocessing.Manager()
+            self._resp_queue = self._multiproc_manager.Queue()
         command["origin"] = "local"
         command["id"] = "local-%s" % self._command_id
         self._command_id += 1
-        resp_queue = self._multiproc_manager.Queue()
-        command["resp_queue"] = resp_queue
+        command["resp_queue"] = self._resp_queue
         self._queue.put(command)
-        result = resp_queue.get()
+        result = self._resp_queue.get()
         print("result:", result)
         if "exception" in result:
             print("Exception occurred while running command")
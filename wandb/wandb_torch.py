@@ -17,36 +17,70 @@ import wandb
 torch = None
 
 
+def _tensor_shape(obj):
+    """Returns the shape of a framework tensor, or None for non-tensors"""
+    if hasattr(obj, "size"):
+        # pytorch tensors use V.size() to get size of tensor
+        return list(obj.size())
+    elif hasattr(obj, "get_shape"):
+        # tensorflow uses V.get_shape() to get size of tensor
+        return obj.get_shape().as_list()
+    elif hasattr(obj, "shape"):
+        return obj.shape
+    return None
+
+
 def nested_shape(array_or_tuple, seen=None):
     """Figures out the shape of tensors possibly embedded in tuples
-     i.e 
+     i.e
      [0,0] returns (2)
      ([0,0], [0,0]) returns (2,2)
      (([0,0], [0,0]),[0,0]) returns ((2,2),2)
      """
     if seen is None:
         seen = set()
-    if hasattr(array_or_tuple, "size"):
-        # pytorch tensors use V.size() to get size of tensor
-        return list(array_or_tuple.size())
-    elif hasattr(array_or_tuple, "get_shape"):
-        # tensorflow uses V.get_shape() to get size of tensor
-        return array_or_tuple.get_shape().as_list()
-    elif hasattr(array_or_tuple, "shape"):
-        return array_or_tuple.shape
+    shape = _tensor_shape(array_or_tuple)
+    if shape is not None:
+        return shape
 
     seen.add(id(array_or_tuple))
     try:
         # treat object as iterable
-        return [
-            nested_shape(item, seen) if id(item) not in seen else 0
-            for item in list(array_or_tuple)
-        ]
+        items = list(array_or_tuple)
     except TypeError:
         # object is not actually iterable
         # LB: Maybe we should throw an error?
         return []
 
+    # walk the structure with an explicit stack so deeply nested (or
+    # self-referential) structures can't blow the recursion limit; `seen`
+    # makes the cycle check O(1) per node
+    result = []
+    stack = [(result, iter(items))]
+    while stack:
+        out, it = stack[-1]
+        for item in it:
+            shape = _tensor_shape(item)
+            if shape is not None:
+                out.append(shape)
+                continue
+            if id(item) in seen:
+                out.append(0)
+                continue
+            seen.add(id(item))
+            try:
+                child_items = list(item)
+            except TypeError:
+                out.append([])
+                continue
+            child = []
+            out.append(child)
+            stack.append((child, iter(child_items)))
+            break
+        else:
+            stack.pop()
+    return result
+
 
 LOG_TRACK_COUNT, LOG_TRACK_THRESHOLD = range(2)
 